@@ -1,54 +1,98 @@
+from collections.abc import Mapping
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import logging
-from logging.handlers import RotatingFileHandler
 from flask_cors import CORS
-import pymysql
-from dotenv import load_dotenv
 import os
 
+from .config import Config, engine_options, is_memory_database
+from .replicas import RoutingSession, replica_binds
 
-pymysql.install_as_MySQLdb()
+# database initialization; the session class routes reads to replicas when configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-# database initialization
-db = SQLAlchemy()
 
-load_dotenv()
-
-
-def create_app():
+def create_app(config=None):
     """
     Factory function for creating a Flask instance
+
+    Args:
+        config: a config object/class, an import string or a dict of settings.
+            When omitted, settings are read from the environment and .env.
     """
     app = Flask(__name__)
+    app.config.from_object(Config)
+
+    if config is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        app.config.from_mapping(Config.from_env())
+    elif isinstance(config, Mapping):
+        app.config.from_mapping(config)
+    else:
+        app.config.from_object(config)
 
     CORS(app)
 
     # database connection
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    replica_uris = list(app.config['REPLICA_DATABASE_URIS'])
+    if any(uri and uri.startswith('mysql://') for uri in [database_uri, *replica_uris]):
+        # plain mysql:// URLs load the MySQLdb driver, served here by PyMySQL
+        import pymysql
+        pymysql.install_as_MySQLdb()
+    configured_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_uri, configured_options)
+    if replica_uris:
+        app.config['SQLALCHEMY_BINDS'] = dict(
+            app.config.get('SQLALCHEMY_BINDS') or {},
+            **replica_binds(replica_uris, configured_options)
+        )
 
     # database initialization
     db.init_app(app)
-    with app.app_context():
-        # check if the database contains tables, if not, create them
-        app.logger.info("Database tables created successfully.")
-        db.create_all()
+
+    from . import metrics, slow_query, profiling, versioning, compression, cache, replicas, typeahead, events, counters
+    cache.init_app(app)
+    replicas.init_app(app)
+    metrics.init_app(app)
+    slow_query.init_app(app)
+    profiling.init_app(app)
+    versioning.init_app(app)
+    compression.init_app(app)
+    typeahead.init_app(app)
+    events.init_app(app)
+    counters.init_app(app)
 
     # blueprint registration
     from .api import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
 
-    # log implementation
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-    file_handler = RotatingFileHandler('logs/inventory.log', maxBytes=10240, backupCount=10)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
+    from .commands import register_commands
+    register_commands(app)
+
+    # an in-memory database starts empty in every process, so it always needs its tables
+    if app.config['CREATE_SCHEMA'] or is_memory_database(database_uri):
+        with app.app_context():
+            db.create_all()
+
+    if app.config['LOG_TO_FILE']:
+        configure_file_logging(app)
+    app.logger.setLevel(app.config['LOG_LEVEL'])
     app.logger.info('Inventory Management System startup')
 
     return app
+
+
+def configure_file_logging(app):
+    """Send app.logger to the rotating inventory.log under LOG_DIR, written off the request thread"""
+    from .logging_setup import queued_file_handler, attach
+
+    handler = queued_file_handler(
+        os.path.join(app.config['LOG_DIR'], 'inventory.log'),
+        logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'),
+        level=app.config['LOG_LEVEL'],
+        max_bytes=app.config['LOG_MAX_BYTES'],
+        backup_count=app.config['LOG_BACKUP_COUNT']
+    )
+    attach(app.logger, handler)
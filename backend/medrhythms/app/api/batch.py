@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request, current_app, g
+from werkzeug.exceptions import HTTPException
+from . import api_bp
+from ..models import db
+from ..replicas import route_reads, READ_METHODS
+from ..metrics import start_request
+
+# a batch inside a batch, or a stream that never ends, can't be answered in one response
+UNBATCHABLE_ENDPOINTS = frozenset({'api.batch', 'api.event_stream'})
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(max_workers):
+    # created on first use, so gunicorn workers never inherit threads from the master
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+        return _executor
+
+
+def _invalid(spec):
+    if not isinstance(spec, dict):
+        return 'must be an object'
+    if not isinstance(spec.get('path'), str) or not spec['path'].startswith('/api/'):
+        return 'path must start with /api/'
+    if not isinstance(spec.get('method', 'GET'), str):
+        return 'method must be a string'
+    if not isinstance(spec.get('headers', {}), dict):
+        return 'headers must be an object'
+    return None
+
+
+def _result(response):
+    body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    headers = {key: value for key, value in response.headers.items() if key != 'Content-Length'}
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def _dispatch(app, spec):
+    """Run one sub-request through its view function in the current app context and session."""
+    with app.test_request_context(
+        spec['path'],
+        method=spec.get('method', 'GET').upper(),
+        json=spec.get('body'),
+        headers=spec.get('headers') or {},
+    ):
+        try:
+            if request.routing_exception is not None:
+                raise request.routing_exception
+            if request.endpoint in UNBATCHABLE_ENDPOINTS:
+                return {'status': 400, 'headers': {}, 'body': {'message': f"{spec['path']} cannot be batched"}}
+            response = app.make_response(app.view_functions[request.endpoint](**request.view_args))
+            result = _result(response)
+        except HTTPException as e:
+            result = {'status': e.code, 'headers': {}, 'body': {'message': e.description}}
+        except Exception as e:
+            current_app.logger.error('Batched %s %s failed: %s', request.method, spec['path'], e)
+            result = {'status': 500, 'headers': {}, 'body': {'message': 'Error handling request', 'details': str(e)}}
+
+    if result['status'] >= 400:
+        # a failed handler may leave changes in the shared session; don't let the next one commit them
+        db.session.rollback()
+    return result
+
+
+def _dispatch_in_own_context(app, spec, replica):
+    # sessions can't cross threads, so each pooled read gets its own app context
+    with app.app_context():
+        g.db_replica = replica
+        # counted in this context's g, then added to the batch's totals
+        start_request()
+        result = _dispatch(app, spec)
+        return result, (g.query_count, g.query_time, g.query_statements)
+
+
+@api_bp.route('/batch', methods=['POST'])
+def batch():
+    """run several api requests in one round trip"""
+    data = request.get_json(silent=True)
+    specs = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(specs, list) or not specs:
+        return jsonify({'message': 'Body must be {"requests": [...]} with at least one request'}), 400
+
+    limit = current_app.config['BATCH_MAX_REQUESTS']
+    if len(specs) > limit:
+        return jsonify({'message': f'At most {limit} requests per batch'}), 400
+
+    errors = {}
+    for index, spec in enumerate(specs):
+        error = _invalid(spec)
+        if error:
+            errors[index] = error
+    if errors:
+        return jsonify({'message': 'Invalid requests', 'errors': errors}), 400
+
+    app = current_app._get_current_object()
+    reads_only = all(spec.get('method', 'GET').upper() in READ_METHODS for spec in specs)
+    if reads_only:
+        g.reads_only = True
+        route_reads()
+
+    if reads_only and data.get('parallel') and len(specs) > 1:
+        replica = g.get('db_replica')
+        pool = _pool(current_app.config['BATCH_MAX_WORKERS'])
+        outcomes = list(pool.map(lambda spec: _dispatch_in_own_context(app, spec, replica), specs))
+        results = [result for result, _ in outcomes]
+        if 'metrics_started' in g:
+            for _, (count, seconds, statements) in outcomes:
+                g.query_count += count
+                g.query_time += seconds
+                g.query_statements.update(statements)
+    else:
+        results = [_dispatch(app, spec) for spec in specs]
+
+    return jsonify({'responses': results}), 200
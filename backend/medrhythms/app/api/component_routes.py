@@ -1,13 +1,14 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from datetime import datetime
 from . import api_bp
 from ..models import (
     Kit, BaseComponent, Phone, SimCard, RightSensor, LeftSensor,
     Headphone, db, Box
 )
-import logging
-
-logging.basicConfig(level=logging.DEBUG)
+from ..serializers import component_serializers, requested_fields
+from ..versioning import conditional, COMPONENT_TABLES
+from ..events import emit
+from ..concurrency import CONFLICT_ERRORS, conflict_response
 
 @api_bp.route('/<component_type>/createByBatch', methods=['POST'])
 def create_by_batch(component_type):
@@ -44,14 +45,17 @@ def create_by_batch(component_type):
                     model_number=model_number,
                     status='available'
                 )
-                print(new_component)
                 db.session.add(new_component)
                 created_components.append(new_component)
-                print(component_id, model_number)
+                current_app.logger.debug(
+                    'Creating %s %s (model %s, batch %s)', component_type, component_id, model_number, batch_number
+                )
             else:
                 return jsonify({"error": "Each component must have an id and model_number"}), 400
 
 
+        emit('component.created', type=component_type.lower(), batch_number=batch_number,
+             ids=[comp.id for comp in created_components])
         db.session.commit()
 
         return jsonify({
@@ -76,7 +80,9 @@ def update_component(component_id):
                 'message': 'Missing status in request body'
             }), 400
 
-        component, component_type, error = BaseComponent.change_state(component_id, new_status)
+        component, component_type, error = BaseComponent.change_state(
+            component_id, new_status, request.json.get('version')
+        )
 
         if error:
             return jsonify({
@@ -91,43 +97,39 @@ def update_component(component_id):
                 'type': component_type,
                 'status': component.status,
                 'updated_at': datetime.utcnow(),
-                'discarded_at': component.discarded_at
+                'discarded_at': component.discarded_at,
+                'version': component.version
             }
         }), 200
 
+    except CONFLICT_ERRORS as e:
+        return conflict_response(e)
     except Exception as e:
-        logging.error(f'Error updating component {component_id}: {str(e)}')
+        current_app.logger.error('Error updating component %s: %s', component_id, e)
         return jsonify({
             'message': 'Error updating status',
             'details': str(e)
         }), 500
 
 @api_bp.route('/components', methods=['GET'])
+@conditional(*COMPONENT_TABLES)
 def get_all_components():
     '''Get all components'''
     try:
-        components = []
+        # every component type shares the same shape, so one field list serves all six
+        fields = requested_fields(component_serializers[0])
 
-        components.append((Phone.query.all(), 'Phone'))
-        components.append((SimCard.query.all(), 'SimCard'))
-        components.append((RightSensor.query.all(), 'RightSensor'))
-        components.append((LeftSensor.query.all(), 'LeftSensor'))
-        components.append((Headphone.query.all(), 'Headphone'))
-        components.append((Box.query.all(), 'Box'))
+        components = []
+        for serializer in component_serializers:
+            components.extend(serializer.dump(db.session, fields))
 
         return jsonify({
             'message': 'Components retrieved successfully',
-            'components': [{
-                'id': component.id,
-                'batch_number': component.batch_number,
-                'status': component.status,
-                'created_at': component.created_at,
-                'discarded_at': component.discarded_at,
-                'kit_id': component.kit_id,
-                'type': component_type
-            } for component_list, component_type in components for component in component_list]
+            'components': components
         }), 200
 
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': component_serializers[0].available}), 400
     except Exception as e:
         return jsonify({
             'message': 'Error retrieving components',
@@ -136,41 +138,25 @@ def get_all_components():
 
 
 @api_bp.route('/components/batch_query/<batch_number>', methods=['GET'])
+@conditional(*COMPONENT_TABLES)
 def get_components_by_batch_number(batch_number):
     '''Get all components by batch number'''
     try:
-        components = []
-
-        phone_components = Phone.query.filter_by(batch_number=batch_number).all()
-        simcard_components = SimCard.query.filter_by(batch_number=batch_number).all()
-        right_sensor_components = RightSensor.query.filter_by(batch_number=batch_number).all()
-        left_sensor_components = LeftSensor.query.filter_by(batch_number=batch_number).all()
-        headphone_components = Headphone.query.filter_by(batch_number=batch_number).all()
-        box_components = Box.query.filter_by(batch_number=batch_number).all()
+        fields = requested_fields(component_serializers[0])
 
-
-        components.extend([(phone_components, 'Phone')])
-        components.extend([(simcard_components, 'SimCard')])
-        components.extend([(right_sensor_components, 'RightSensor')])
-        components.extend([(left_sensor_components, 'LeftSensor')])
-        components.extend([(headphone_components, 'Headphone')])
-        components.extend([(box_components, 'Box')])
+        components = []
+        for serializer in component_serializers:
+            components.extend(serializer.dump(db.session, fields, serializer.model.batch_number == batch_number))
 
         response_data = {
             'message': f'Components with batch number {batch_number} retrieved successfully',
-            'components': [{
-                'id': component.id,
-                'batch_number': component.batch_number,
-                'status': component.status,
-                'created_at': component.created_at,
-                'discarded_at': component.discarded_at,
-                'kit_id': component.kit_id,
-                'type': component_type
-            } for component_list, component_type in components for component in component_list]
+            'components': components
         }
 
         return jsonify(response_data), 200
 
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': component_serializers[0].available}), 400
     except Exception as e:
         return jsonify({
             'message': 'Error retrieving components by batch number',
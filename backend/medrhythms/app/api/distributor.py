@@ -1,44 +1,37 @@
 from flask import Blueprint, jsonify, request
 from ..models import Distributor, db
+from ..cache import distributor_cache
+from ..serializers import distributor_serializer, requested_fields
+from ..versioning import conditional
+from ..events import emit
 from datetime import datetime
 from . import api_bp
 
 @api_bp.route('/distributors', methods=['GET'])
+@conditional('distributor')
 def get_all_distributors():
     """Get all distributors"""
     try:
-        distributors = Distributor.query.all()
-        return jsonify([{
-            'id': distributor.id,
-            'name': distributor.name,
-            'email': distributor.email,
-            'tel': distributor.tel,
-            'address': distributor.address,
-            'city': distributor.city,
-            'contactPerson': distributor.contact_person,
-            'status': distributor.status,
-            'createdAt': distributor.created_at
-        } for distributor in distributors]), 200
+        fields = requested_fields(distributor_serializer)
+        return jsonify(distributor_serializer.dump(db.session, fields)), 200
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': distributor_serializer.available}), 400
     except Exception as e:
         return jsonify({'message': 'Error fetching distributors', 'details': str(e)}), 500
 
 
 @api_bp.route('/distributors/<string:distributor_id>', methods=['GET'])
+@conditional('distributor')
 def get_distributor_by_id(distributor_id):
     """Get a distributor by ID"""
     try:
-        distributor = Distributor.query.get_or_404(distributor_id)
-        return jsonify({
-            'id': distributor.id,
-            'name': distributor.name,
-            'email': distributor.email,
-            'tel': distributor.tel,
-            'address': distributor.address,
-            'city': distributor.city,
-            'contactPerson': distributor.contact_person,
-            'status': distributor.status,
-            'createdAt': distributor.created_at
-        }), 200
+        fields = requested_fields(distributor_serializer)
+        rows = distributor_serializer.dump(db.session, fields, Distributor.id == distributor_id)
+        if not rows:
+            return jsonify({'message': 'Distributor not found', 'details': f'Distributor {distributor_id} does not exist'}), 404
+        return jsonify(rows[0]), 200
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': distributor_serializer.available}), 400
     except Exception as e:
         return jsonify({'message': 'Distributor not found', 'details': str(e)}), 404
 
@@ -60,7 +53,9 @@ def create_distributor():
             created_at=datetime.utcnow()
         )
         db.session.add(new_distributor)
+        emit('distributor.created', id=new_distributor.id, status=new_distributor.status)
         db.session.commit()
+        distributor_cache.invalidate(new_distributor.id)
         return jsonify({'message': 'Distributor created successfully'}), 201
     except Exception as e:
         return jsonify({'message': 'Error creating distributor', 'details': str(e)}), 500
@@ -79,7 +74,9 @@ def update_distributor(distributor_id):
         distributor.city = data.get('city', distributor.city)
         distributor.contact_person = data.get('contactPerson', distributor.contact_person)
         distributor.status = data.get('status', distributor.status)
+        emit('distributor.updated', id=distributor_id, status=distributor.status)
         db.session.commit()
+        distributor_cache.invalidate(distributor_id)
         return jsonify({'message': 'Distributor updated successfully'}), 200
     except Exception as e:
         return jsonify({'message': 'Error updating distributor', 'details': str(e)}), 500
@@ -97,7 +94,9 @@ def update_distributor_status(distributor_id):
             return jsonify({'message': 'Invalid status. Must be "active" or "inactive".'}), 400
 
         distributor.status = new_status
+        emit('distributor.updated', id=distributor_id, status=new_status)
         db.session.commit()
+        distributor_cache.invalidate(distributor_id)
 
         return jsonify({'message': f'Distributor status updated to {new_status} successfully.'}), 200
 
@@ -0,0 +1,64 @@
+import time
+
+from flask import Response, current_app, g, jsonify, request, stream_with_context
+from . import api_bp
+from ..models import db
+from ..events import broker, format_event, WATCHED_TABLES
+
+
+@api_bp.route('/events', methods=['GET'])
+def event_stream():
+    """server-sent events for kit, component and distributor changes"""
+    config = current_app.config
+    types = {name.strip() for name in request.args.get('types', '').split(',') if name.strip()}
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+
+    if not broker.open_stream(config['EVENTS_MAX_STREAMS']):
+        response = jsonify({'message': 'Too many event streams open on this worker, retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+    # the version check must see the primary, not a lagging replica
+    g.db_replica = None
+    after, missed = broker.position(last_event_id)
+
+    def generate():
+        nonlocal after
+        yield f"retry: {config['EVENTS_RETRY_MS']}\n\n"
+        if missed:
+            yield format_event('resync', {'tables': list(WATCHED_TABLES)})
+
+        heartbeat = config['EVENTS_HEARTBEAT_SECONDS']
+        closes_at = time.monotonic() + config['EVENTS_STREAM_SECONDS']
+        last_sent = time.monotonic()
+        while time.monotonic() < closes_at:
+            entries = broker.wait(after, timeout=min(heartbeat, config['EVENTS_RESYNC_SECONDS']))
+            if entries and entries[0][0] > after + 1:
+                # this stream fell further behind than the buffer reaches
+                yield format_event('resync', {'tables': list(WATCHED_TABLES)})
+            frames = [
+                frame for _, frame, event_type in entries
+                if not types or event_type == 'resync' or event_type.split('.')[0] in types
+            ]
+            if entries:
+                after = entries[-1][0]
+            if frames:
+                yield ''.join(frames)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= heartbeat:
+                yield ': keepalive\n\n'
+                last_sent = time.monotonic()
+
+            broker.check_versions(config['EVENTS_RESYNC_SECONDS'])
+            # don't hold a pooled connection between checks
+            db.session.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # runs even if the client goes away before the first frame
+    response.call_on_close(broker.close_stream)
+    return response
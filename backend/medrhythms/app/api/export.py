@@ -1,11 +1,14 @@
-from flask import Blueprint, jsonify, send_file, request
+from flask import Blueprint, jsonify, send_file, request, Response, stream_with_context
 from io import BytesIO, StringIO
 import json
 import csv
 import zipfile
 from ..models import Kit, Distributor, ComponentUsage, Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+from ..importer import IMPORT_ORDER
 from . import api_bp
 
+EXPORT_BATCH_SIZE = 1000
+
 
 def serialize_model(model):
     return {col.name: getattr(model, col.name) for col in model.__table__.columns}
@@ -58,6 +61,22 @@ def export_csv():
 
     zip_buffer.seek(0)
     return send_file(zip_buffer, as_attachment=True, download_name='database_export.zip', mimetype='application/zip')
+
+
+def export_ndjson():
+    """Stream one {"table", "row"} object per line in FK order, ready for /import"""
+    def generate():
+        for table_name, model in IMPORT_ORDER:
+            for record in model.query.yield_per(EXPORT_BATCH_SIZE):
+                yield json.dumps({'table': table_name, 'row': serialize_model(record)}, default=str) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=database_export.ndjson'}
+    )
+
+
 @api_bp.route('/exportdb', methods=['GET'])
 def export_all():
     format = request.args.get('format', 'json').lower()
@@ -67,8 +86,10 @@ def export_all():
             return export_json()
         elif format == 'csv':
             return export_csv()
+        elif format == 'ndjson':
+            return export_ndjson()
         else:
-            return jsonify({'error': 'Invalid format. Supported formats: json, csv'}), 400
+            return jsonify({'error': 'Invalid format. Supported formats: json, csv, ndjson'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
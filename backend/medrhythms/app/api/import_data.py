@@ -1,14 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import request, jsonify, current_app
 from medrhythms.app import db
-from medrhythms.app.models import Kit, Distributor, ComponentUsage
-from medrhythms.app.models import Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+from medrhythms.app.importer import (
+    ImportEngine, ImportValidator, iter_json_document, iter_ndjson, iter_csv_zip
+)
 import json
-from datetime import datetime
+import zipfile
 from . import api_bp
 
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
 
-def parse_datetime(dt_str):
-    return datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S") if dt_str else None
+
+def detect_format(file):
+    """Pick the import format from the ``format`` form field or the file extension."""
+    requested = request.form.get('format', '').lower()
+    if requested:
+        return requested
+    if file.filename.lower().endswith(NDJSON_EXTENSIONS):
+        return 'ndjson'
+    if file.filename.lower().endswith('.zip'):
+        return 'csv'
+    return 'json'
 
 
 @api_bp.route('/import', methods=['POST'])
@@ -20,131 +31,55 @@ def import_data():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    data = json.load(file)
-
+    import_format = detect_format(file)
     try:
-        # Distributors
-        for d in data.get('distributors', []):
-            distributor = Distributor(
-                id=d['id'],
-                name=d['name'],
-                email=d['email'],
-                tel=d['tel'],
-                address=d['address'],
-                city=d['city'],
-                contact_person=d['contact_person'],
-                status=d['status'],
-                created_at=parse_datetime(d['created_at']),
-            )
-            db.session.merge(distributor)
-
-        # Kits
-        for k in data.get('kits', []):
-            kit = Kit(
-                id=k['id'],
-                created_at=parse_datetime(k['created_at']),
-                updated_at=parse_datetime(k['updated_at']),
-                status=k['status'],
-                distributor_id=k['distributor_id'],
-                distributor_name=k['distributor_name'],
-                dispense_date=parse_datetime(k['dispense_date']),
-            )
-            db.session.merge(kit)
-
-        # Component Usages
-        for cu in data.get('component_usages', []):
-            usage = ComponentUsage(
-                id=cu['id'],
-                component_id=cu['component_id'],
-                component_type=cu['component_type'],
-                kit_id=cu['kit_id'],
-                distributor_id=cu['distributor_id'],
-                start_time=parse_datetime(cu['start_time']),
-                end_time=parse_datetime(cu['end_time']),
-            )
-            db.session.merge(usage)
-
-        # Phones
-        for p in data.get('phones', []):
-            phone = Phone(
-                id=p['id'],
-                created_at=parse_datetime(p['created_at']),
-                batch_number=p['batch_number'],
-                model_number=p['model_number'],
-                status=p['status'],
-                discarded_at=parse_datetime(p['discarded_at']),
-                kit_id=p['kit_id'],
-            )
-            db.session.merge(phone)
-
-        # SIM Cards
-        for s in data.get('sim_cards', []):
-            sim = SimCard(
-                id=s['id'],
-                created_at=parse_datetime(s['created_at']),
-                batch_number=s['batch_number'],
-                model_number=s['model_number'],
-                status=s['status'],
-                discarded_at=parse_datetime(s['discarded_at']),
-                kit_id=s['kit_id'],
-            )
-            db.session.merge(sim)
+        resume_from = int(request.form.get('resume_from', 0))
+    except ValueError:
+        return jsonify({'error': 'resume_from must be an integer'}), 400
+    if resume_from and import_format != 'ndjson':
+        # json and csv uploads are re-imported whole; upserts make that safe
+        return jsonify({'error': 'resume_from is only supported for NDJSON imports; re-send the whole file'}), 400
+
+    if import_format == 'json':
+        try:
+            records = iter_json_document(json.load(file))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid JSON file: {e}'}), 400
+    elif import_format == 'ndjson':
+        # read straight from the upload stream, one record at a time
+        records = iter_ndjson(file.stream, skip=resume_from)
+    elif import_format == 'csv':
+        if not zipfile.is_zipfile(file.stream):
+            return jsonify({'error': 'CSV imports must be a zip file as produced by /exportdb?format=csv'}), 400
+        file.stream.seek(0)
+        records = iter_csv_zip(file.stream)
+    else:
+        return jsonify({'error': 'Invalid format. Supported formats: json, ndjson, csv'}), 400
+
+    if request.form.get('dry_run', request.args.get('dry_run', '')).lower() in ('1', 'true', 'yes'):
+        try:
+            return jsonify(ImportValidator().validate(records)), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+
+    engine = ImportEngine(chunk_size=current_app.config.get('IMPORT_CHUNK_SIZE'))
 
-        # Right Sensors
-        for rs in data.get('right_sensors', []):
-            right_sensor = RightSensor(
-                id=rs['id'],
-                created_at=parse_datetime(rs['created_at']),
-                batch_number=rs['batch_number'],
-                model_number=rs['model_number'],
-                status=rs['status'],
-                discarded_at=parse_datetime(rs['discarded_at']),
-                kit_id=rs['kit_id'],
-            )
-            db.session.merge(right_sensor)
-
-        # Left Sensors
-        for ls in data.get('left_sensors', []):
-            left_sensor = LeftSensor(
-                id=ls['id'],
-                created_at=parse_datetime(ls['created_at']),
-                batch_number=ls['batch_number'],
-                model_number=ls['model_number'],
-                status=ls['status'],
-                discarded_at=parse_datetime(ls['discarded_at']),
-                kit_id=ls['kit_id'],
-            )
-            db.session.merge(left_sensor)
-
-        # Headphones
-        for h in data.get('headphones', []):
-            headphone = Headphone(
-                id=h['id'],
-                created_at=parse_datetime(h['created_at']),
-                batch_number=h['batch_number'],
-                model_number=h['model_number'],
-                status=h['status'],
-                discarded_at=parse_datetime(h['discarded_at']),
-                kit_id=h['kit_id'],
-            )
-            db.session.merge(headphone)
-
-        # Boxes
-        for b in data.get('boxes', []):
-            box = Box(
-                id=b['id'],
-                created_at=parse_datetime(b['created_at']),
-                batch_number=b['batch_number'],
-                model_number=b['model_number'],
-                status=b['status'],
-                discarded_at=parse_datetime(b['discarded_at']),
-                kit_id=b['kit_id'],
-            )
-            db.session.merge(box)
-
-        db.session.commit()
-        return jsonify({'message': 'Data imported successfully'})
+    try:
+        engine.load(records)
+        return jsonify({
+            'message': 'Data imported successfully',
+            'imported': engine.counts,
+            'chunks': engine.chunks
+        })
 
     except Exception as e:
+        # chunks committed before the failure stay in place; re-importing is idempotent
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        response = {
+            'error': str(e),
+            'imported': engine.counts,
+            'chunks': engine.chunks
+        }
+        if import_format == 'ndjson':
+            response['resume_from'] = resume_from + engine.committed
+        return jsonify(response), 500
@@ -1,38 +1,32 @@
 import random
 
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from datetime import datetime
 from . import api_bp
 from ..models import (
     Kit, Phone, SimCard, RightSensor, LeftSensor, 
-    Headphone, db, Box
+    Headphone, db, Box, KitSequence
 )
-
-kit_creation_counter = {
-    'date': None,
-    'count': 0
-}
-
+from ..events import emit
+from ..concurrency import CONFLICT_ERRORS, conflict_response, expect_version
 
 def generate_kit_id():
-    today = datetime.now().strftime('%m%d%y')  # e.g., 092623
-    current_date = datetime.now().date()
-
-    if kit_creation_counter['date'] != current_date:
-        kit_creation_counter['date'] = current_date
-        kit_creation_counter['count'] = 1
-    else:
-        kit_creation_counter['count'] += 1
+    """Next kit id for today, e.g. MR092623001, numbered by the kit_sequence table"""
+    now = datetime.now()
+    today = now.strftime('%m%d%y')  # e.g., 092623
 
-    count = kit_creation_counter['count']
-    if count <= 999:
-        serial_number = f"MR{today}{count:03d}"  #  MR092623001
-    elif count <= 9999:
-        serial_number = f"MR{today}{count:04d}"  #  MR0926231000
-    else:
-        serial_number = f"MR{today}{count:05d}"  # MR09262310000
+    while True:
+        count = KitSequence.next_value(db.session.connection(), now.date())
+        if count <= 999:
+            serial_number = f"MR{today}{count:03d}"  #  MR092623001
+        elif count <= 9999:
+            serial_number = f"MR{today}{count:04d}"  #  MR0926231000
+        else:
+            serial_number = f"MR{today}{count:05d}"  # MR09262310000
 
-    return serial_number
+        # kits numbered before the sequence table existed may already hold this id
+        if db.session.get(Kit, serial_number) is None:
+            return serial_number
 
 
 @api_bp.route('/kits/create', methods=['POST'])
@@ -40,7 +34,7 @@ def create_kit():
     """Create a kit with components chosen"""
     try:
         data = request.get_json()
-        print(data)
+        current_app.logger.debug('Create kit request: %s', data)
         # Define mapping
         required_components = {
             'phone_ID': Phone,
@@ -89,6 +83,7 @@ def create_kit():
         for component_id_key, component in components.items():
             component.status = 'in-kit'
             component.kit_id = new_kit_id
+        emit('kit.created', id=new_kit_id, components=[c.id for c in components.values()])
 
         db.session.commit()
 
@@ -97,6 +92,10 @@ def create_kit():
             'kit_ID': new_kit_id
         }), 201
 
+    except CONFLICT_ERRORS as e:
+        # another station took one of the components between our read and commit
+        db.session.rollback()
+        return conflict_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -122,6 +121,7 @@ def disassemble_kit():
                 'message': 'Kit not found',
                 'details': f'Kit {kit_id} does not exist'
             }), 404
+        expect_version(kit, data.get('version'))
             
         updated_components = []
         components = [
@@ -144,6 +144,7 @@ def disassemble_kit():
                 })
         
         kit.status = 'Scarped'
+        emit('kit.disassembled', id=kit_id, components=[c['component_ID'] for c in updated_components])
         
         db.session.commit()
         
@@ -152,6 +153,13 @@ def disassemble_kit():
             'updated_components': updated_components
         }), 200
         
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
+    except ValueError as e:
+        # a malformed version from the client
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -193,7 +201,6 @@ def batch_disassemble_kit():
                 ('headphone', kit.headphone),
                 ('box', kit.box)
             ]
-            print(components)
 
             for component_type, component in components:
                 if component:
@@ -207,6 +214,9 @@ def batch_disassemble_kit():
                     })
 
             kit.status = 'Scarped'
+            emit('kit.disassembled', id=kit_id,
+                 components=[c['component_ID'] for c in updated_components if c['kit_ID'] == kit_id])
+            current_app.logger.debug('Disassembling kit %s', kit_id)
 
         # Commit all the changes
         db.session.commit()
@@ -217,6 +227,9 @@ def batch_disassemble_kit():
             'failed_kits': failed_kit_ids
         }), 200
 
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -277,6 +290,7 @@ def create_many_kits():
                 for component in components.values():
                     component.status = 'in-kit'
                     component.kit_id = new_kit_id
+                emit('kit.created', id=new_kit_id, components=[c.id for c in components.values()])
 
                 created_kits.append(new_kit_id)
 
@@ -295,6 +309,9 @@ def create_many_kits():
             'errors': errors
         }), 201 if created_kits else 400
 
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -314,17 +331,27 @@ def kits_satus_change():
                 'message': 'Kit not found',
                 'details': f'Kit {kit_id} does not exist'
             }), 400
+        expect_version(kit, data.get('version'))
         if status == kit.status:
             return jsonify({
                 'message': f'Kit is already in status {status}'
             }), 404
         kit.status = status
+        emit('kit.status_changed', id=kit_id, status=status)
         db.session.commit()
         return jsonify({
             'message': 'Kit stauts changed successfully',
             'kit_id': kit_id,
-            'status': status
+            'status': status,
+            'version': kit.version
         }),200
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
+    except ValueError as e:
+        # a malformed version from the client
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
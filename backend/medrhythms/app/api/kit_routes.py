@@ -1,28 +1,117 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from . import api_bp
 from ..models import (
     Kit, Phone, SimCard, RightSensor, LeftSensor,
     Headphone, db, ComponentUsage, Distributor,Box
 )
-from datetime import datetime
+from ..serializers import kit_serializer, requested_fields
+from ..versioning import conditional
+from ..events import emit
+from ..concurrency import CONFLICT_ERRORS, conflict_response, expect_version
+from ..pagination import encode_cursor, decode_cursor, after
+from sqlalchemy import union
+from datetime import datetime, timedelta
+
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 500
 
 @api_bp.route('/kits/getAll', methods=['GET'])
+@conditional('kit')
 def get_all_kits():
     """get all kits"""
     try:
-        kits = Kit.query.all()
-        return jsonify([{
-            'id': kit.id,
-            'created_at': kit.created_at,
-            'status': kit.status,
-            'batch_number': 0000,
-            'distributor': kit.distributor_name if kit.distributor else None,
-            'dispense_date': kit.dispense_date
-        } for kit in kits]), 200
+        fields = requested_fields(kit_serializer)
+        return jsonify(kit_serializer.dump(db.session, fields)), 200
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': kit_serializer.available}), 400
     except Exception as e:
         return jsonify({'message': 'Error fetching kits', 'details': str(e)}), 500
 
 
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _matches(column, values):
+    return column == values[0] if len(values) == 1 else column.in_(values)
+
+
+def _search_criteria(args):
+    """WHERE criteria, ORDER BY and page size for /kits/search (raises ValueError on bad input)"""
+    criteria = []
+
+    statuses = _split(args.get('status'))
+    if statuses:
+        criteria.append(_matches(Kit.status, statuses))
+    distributor_ids = _split(args.get('distributorId'))
+    if distributor_ids:
+        criteria.append(_matches(Kit.distributor_id, distributor_ids))
+
+    # a bare date as endDate includes that whole day
+    if args.get('startDate'):
+        criteria.append(Kit.created_at >= datetime.fromisoformat(args['startDate']))
+    if args.get('endDate'):
+        end_date = args['endDate']
+        if len(end_date) == 10:
+            criteria.append(Kit.created_at < datetime.fromisoformat(end_date) + timedelta(days=1))
+        else:
+            criteria.append(Kit.created_at <= datetime.fromisoformat(end_date))
+
+    sort = args.get('sort', '-created_at')
+    if sort not in ('created_at', '-created_at'):
+        raise ValueError("sort must be 'created_at' or '-created_at'")
+    descending = sort.startswith('-')
+    keys = [Kit.created_at, Kit.id]
+    order_by = [key.desc() for key in keys] if descending else keys
+
+    if args.get('cursor'):
+        cursor = decode_cursor(args['cursor'], datetime.fromisoformat, str)
+        criteria.append(after(keys, cursor, descending))
+
+    limit = int(args.get('limit', SEARCH_DEFAULT_LIMIT))
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return criteria, order_by, min(limit, SEARCH_MAX_LIMIT)
+
+
+@api_bp.route('/kits/search', methods=['GET'])
+@conditional('kit')
+def search_kits():
+    """search kits by any combination of status, distributor and creation date, one page at a time"""
+    try:
+        fields = requested_fields(kit_serializer)
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': kit_serializer.available}), 400
+    try:
+        criteria, order_by, limit = _search_criteria(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        # the sort keys ride along after the requested columns to build the next cursor
+        stmt = (
+            kit_serializer.select(fields)
+            .add_columns(Kit.created_at, Kit.id)
+            .where(*criteria)
+            .order_by(*order_by)
+            .limit(limit + 1)
+        )
+        rows = db.session.execute(stmt).all()
+        to_dict = kit_serializer.compile(fields)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][-2].isoformat(), rows[-1][-1]])
+
+        return jsonify({
+            'kits': [to_dict(row) for row in rows],
+            'next_cursor': next_cursor
+        }), 200
+    except Exception as e:
+        return jsonify({'message': 'Error searching kits', 'details': str(e)}), 500
+
+
 @api_bp.route('/kits/<string:kit_id>', methods=['GET'])
 def get_kit_by_id(kit_id):
     """get kit by id"""
@@ -34,7 +123,9 @@ def get_kit_by_id(kit_id):
             'created_at': kit.created_at,
             'status': kit.status,
             'batch_number': 0,
-            'distributor': kit.distributor,
+            # the name and id, as in the list endpoints; the Distributor object itself isn't serializable
+            'distributor': kit.distributor_name,
+            'distributor_id': kit.distributor_id,
             'dispense_date': kit.dispense_date,
             'components': {
                 'phone': kit.phone.id if kit.phone else None,
@@ -57,7 +148,7 @@ def get_kits_by_created_at_desc():
             'id': kit.id,
             'created_at': kit.created_at,
             'status': kit.status,
-            'batch_number': kit.batch_number
+            'batch_number': 0
         } for kit in kits]), 200
     except Exception as e:
         return jsonify({'message': 'Error fetching kits', 'details': str(e)}), 500
@@ -96,7 +187,12 @@ def get_kits_by_batch_number():
     """get kits by batch number"""
     try:
         batch_number = request.args.get('batchNumber')
-        kits = Kit.query.filter_by(batch_number=batch_number).all()
+        # kits have no batch of their own: match the kits built from components of this batch
+        kit_ids = union(*[
+            db.select(model.kit_id).where(model.batch_number == batch_number, model.kit_id.isnot(None))
+            for model in (Phone, SimCard, RightSensor, LeftSensor, Headphone, Box)
+        ])
+        kits = Kit.query.filter(Kit.id.in_(kit_ids)).all()
 
         if not kits:
             return jsonify({'message': 'No kits found with this batch number'}), 404
@@ -105,7 +201,7 @@ def get_kits_by_batch_number():
             'id': kit.id,
             'created_at': kit.created_at,
             'status': kit.status,
-            'batch_number': kit.batch_number
+            'batch_number': batch_number
         } for kit in kits]), 200
     except Exception as e:
         return jsonify({'message': 'Error fetching kits', 'details': str(e)}), 500
@@ -124,7 +220,7 @@ def get_kits_by_status():
             'id': kit.id,
             'created_at': kit.created_at,
             'status': kit.status,
-            'batch_number': kit.batch_number
+            'batch_number': 0
         } for kit in kits]), 200
     except Exception as e:
         return jsonify({'message': 'Error fetching kits', 'details': str(e)}), 500
@@ -148,7 +244,7 @@ def get_kits_by_distributor_id():
             'id': kit.id,
             'created_at': kit.created_at,
             'status': kit.status,
-            'batch_number': kit.batch_number,
+            'batch_number': 0,
             'distributor_id': kit.distributor_id,
             'distributor_name': kit.distributor_name,
             'dispense_date': kit.dispense_date
@@ -166,11 +262,15 @@ def distribute_kits():
         kits_ids = data.get('kits')
         distributor_id = data.get('distributor_id')
         start_time_str = data.get('start_time')
+        # optional {kit_id: version} the station last saw
+        versions = data.get('versions') or {}
         if not kits_ids or not distributor_id:
             return jsonify({'message': 'Missing required fields: kits or distributor_id'}), 400
+        if not isinstance(versions, dict):
+            return jsonify({'message': 'versions must be an object of {kit_id: version}'}), 400
 
 
-        distributor = Distributor.query.get(distributor_id)
+        distributor = Distributor.cached(distributor_id)
         if not distributor:
             return jsonify({'message': f'Distributor {distributor_id} not found'}), 404
 
@@ -184,14 +284,15 @@ def distribute_kits():
 
         for kit_id in kits_ids:
             kit = Kit.query.get(kit_id)
-            print(kit)
             if not kit:
                 return jsonify({'message': f'Kit {kit_id} not found'}), 404
+            expect_version(kit, versions.get(kit_id))
 
             kit.distributor_id = distributor_id
             kit.distributor_name = distributor.name
             kit.status = 'In-use'
             kit.dispense_date = start_time
+            emit('kit.distributed', id=kit_id, distributor_id=distributor_id, dispense_date=start_time)
 
             components = [
                 ('phone', kit.phone),
@@ -201,7 +302,7 @@ def distribute_kits():
                 ('headphone', kit.headphone),
                 ('box', kit.box)
             ]
-            print(components)
+            current_app.logger.debug('Distributing kit %s to distributor %s', kit_id, distributor_id)
             # Create new records
             for component_type, component in components:
                 if not component:
@@ -219,6 +320,13 @@ def distribute_kits():
         db.session.commit()
         return jsonify({'message': f'{len(kits_ids)} kits distributed successfully'}), 200
 
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
+    except ValueError as e:
+        # a malformed version from the client
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Distribution failed', 'error': str(e)}), 500
@@ -230,12 +338,15 @@ def collect_kits():
     """upadate the end_time in component_usage """
     try:
         data = request.get_json()
-        print(data)
+        current_app.logger.debug('Collect kits request: %s', data)
         kits_ids = data.get('kits')
         end_time_str = data.get('endTime')
+        versions = data.get('versions') or {}
 
         if not kits_ids:
             return jsonify({'message': 'Missing required fields: kits or distributorId'}), 400
+        if not isinstance(versions, dict):
+            return jsonify({'message': 'versions must be an object of {kit_id: version}'}), 400
 
         end_time = datetime.utcnow()
         if end_time_str:
@@ -249,9 +360,11 @@ def collect_kits():
             kit = Kit.query.get(kit_id)
             if not kit:
                 return jsonify({'message': f'Kit {kit_id} not found'}), 404
+            expect_version(kit, versions.get(kit_id))
 
             kit.status = 'Used'
             kit.distributor_id = None
+            emit('kit.collected', id=kit_id, end_time=end_time)
 
             components = [
                 ('phone', kit.phone),
@@ -295,6 +408,13 @@ def collect_kits():
         db.session.commit()
         return jsonify({'message': f'{len(kits_ids)} kits collected successfully'}), 200
 
+    except CONFLICT_ERRORS as e:
+        db.session.rollback()
+        return conflict_response(e)
+    except ValueError as e:
+        # a malformed version from the client
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Collection failed', 'error': str(e)}), 500
\ No newline at end of file
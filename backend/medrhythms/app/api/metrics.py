@@ -0,0 +1,69 @@
+import time
+from flask import jsonify, request, g, current_app
+from . import api_bp
+from ..models import db
+from ..metrics import pool_snapshot, request_metrics, start_request
+from ..cache import caches
+from ..typeahead import current_index
+from ..events import broker
+
+
+@api_bp.before_request
+def start_request_metrics():
+    start_request()
+
+
+@api_bp.after_request
+def record_request_metrics(response):
+    if 'metrics_started' not in g:
+        return response
+
+    wall_ms = (time.perf_counter() - g.metrics_started) * 1000
+    db_ms = g.query_time * 1000
+    threshold = current_app.config['N_PLUS_ONE_QUERY_THRESHOLD']
+    suspected = g.query_count > threshold
+
+    if suspected:
+        statement, repeats = g.query_statements.most_common(1)[0]
+        current_app.logger.warning(
+            'Suspected N+1 on %s %s: %d queries (threshold %d), most repeated %dx: %s',
+            request.method, request.path, g.query_count, threshold, repeats, statement[:200]
+        )
+
+    request_metrics.record(
+        request.endpoint or request.path, wall_ms, db_ms, g.query_count,
+        response.status_code, suspected
+    )
+    if response.is_streamed and not response.direct_passthrough:
+        # a generated body runs its queries after this hook, so any count here would be too low
+        # (send_file bodies are passthrough files, produced before it)
+        return response
+    response.headers['X-Query-Count'] = str(g.query_count)
+    response.headers['Server-Timing'] = f'db;dur={db_ms:.1f}, total;dur={wall_ms:.1f}'
+    return response
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-endpoint latency histograms and query counts, plus pool, cache, replica, typeahead and event feed state"""
+    replicas = current_app.extensions.get('replicas')
+    return jsonify({
+        'endpoints': request_metrics.snapshot(),
+        'pools': {
+            (name or 'default'): pool_snapshot(engine)
+            for name, engine in db.engines.items()
+        },
+        'caches': {name: cache.stats() for name, cache in caches.items()},
+        'replicas': replicas.snapshot() if replicas else {},
+        'typeahead': current_index().stats(),
+        'events': broker.stats()
+    }), 200
+
+
+@api_bp.route('/metrics/pool', methods=['GET'])
+def get_pool_metrics():
+    """Connection pool state and checkout wait times for every engine"""
+    return jsonify({
+        (name or 'default'): pool_snapshot(engine)
+        for name, engine in db.engines.items()
+    }), 200
@@ -0,0 +1,46 @@
+from flask import jsonify, request, current_app
+from . import api_bp
+from ..models import db
+from .. import reconcile
+
+
+def _checks(names):
+    return reconcile.select_checks([name.strip() for name in names if name.strip()])
+
+
+@api_bp.route('/reconcile', methods=['GET'])
+def get_reconciliation_report():
+    """inconsistencies between kits, components and usage records, without changing anything"""
+    try:
+        checks = _checks(request.args.get('checks', '').split(','))
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': list(reconcile.CHECKS_BY_NAME)}), 400
+    try:
+        return jsonify({'checks': reconcile.report(db.session, checks, current_app.config['RECONCILE_SAMPLE_SIZE'])}), 200
+    except Exception as e:
+        return jsonify({'message': 'Error running reconciliation checks', 'details': str(e)}), 500
+
+
+@api_bp.route('/reconcile', methods=['POST'])
+def repair_inconsistencies():
+    """fix the repairable inconsistencies in batches, then report what is left"""
+    data = request.get_json(silent=True) or {}
+    try:
+        checks = _checks(data.get('checks') or [])
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': str(e), 'allowed': list(reconcile.CHECKS_BY_NAME)}), 400
+    try:
+        batch_size = int(data.get('batch_size', current_app.config['RECONCILE_BATCH_SIZE']))
+    except (ValueError, TypeError):
+        batch_size = 0
+    if batch_size < 1:
+        return jsonify({'message': 'batch_size must be a positive integer'}), 400
+
+    try:
+        fixed = reconcile.repair(db.session, checks, batch_size)
+        remaining = reconcile.report(db.session, checks, current_app.config['RECONCILE_SAMPLE_SIZE'])
+        current_app.logger.info('Reconciliation repaired %d rows', sum(fixed.values()))
+        return jsonify({'fixed': fixed, 'checks': remaining}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error repairing inconsistencies', 'details': str(e)}), 500
@@ -0,0 +1,32 @@
+from flask import jsonify, request, current_app, g
+from . import api_bp
+from ..models import db
+from ..replicas import route_reads
+from ..scan import resolve
+
+
+@api_bp.route('/scan', methods=['POST'])
+def resolve_scanned_ids():
+    """type, status, kit and distributor of each scanned kit or component id"""
+    data = request.get_json(silent=True)
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(scanned, str) for scanned in ids):
+        return jsonify({'message': 'Body must be {"ids": [...]} with at least one id string'}), 400
+
+    limit = current_app.config['SCAN_MAX_IDS']
+    if len(ids) > limit:
+        return jsonify({'message': f'At most {limit} ids per scan'}), 400
+
+    # a POST only so hundreds of ids fit in the body; it reads like a GET
+    g.reads_only = True
+    route_reads()
+
+    ids = list(dict.fromkeys(scanned.strip() for scanned in ids if scanned.strip()))
+    try:
+        found = resolve(db.session, ids)
+        return jsonify({
+            'results': [found[scanned] for scanned in ids if scanned in found],
+            'unknown': [scanned for scanned in ids if scanned not in found],
+        }), 200
+    except Exception as e:
+        return jsonify({'message': 'Error resolving scanned ids', 'details': str(e)}), 500
@@ -0,0 +1,15 @@
+from flask import jsonify
+from . import api_bp
+from ..models import db
+from ..counters import summary
+from ..versioning import conditional, COMPONENT_TABLES
+
+
+@api_bp.route('/summary', methods=['GET'])
+@conditional('kit', *COMPONENT_TABLES)
+def get_inventory_summary():
+    """Component counts per type and status, and kit counts per status and distributor"""
+    try:
+        return jsonify(summary(db.session)), 200
+    except Exception as e:
+        return jsonify({'message': 'Error building summary', 'details': str(e)}), 500
@@ -0,0 +1,30 @@
+from flask import jsonify, request, current_app
+from . import api_bp
+from ..typeahead import current_index, TYPES
+
+DEFAULT_LIMIT = 10
+
+
+@api_bp.route('/typeahead', methods=['GET'])
+def typeahead():
+    """kit, component and distributor ids starting with the typed prefix"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Missing q parameter'}), 400
+
+    types = [name.strip() for name in request.args.get('types', '').split(',') if name.strip()]
+    unknown = [name for name in types if name not in TYPES]
+    if unknown:
+        return jsonify({'message': f"Unknown types: {', '.join(unknown)}", 'allowed': TYPES}), 400
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, current_app.config['TYPEAHEAD_MAX_RESULTS']))
+
+    try:
+        matches = current_index().search(query, limit, types or None, request.args.get('status'))
+        return jsonify({'query': query, 'matches': matches}), 200
+    except Exception as e:
+        return jsonify({'message': 'Error searching ids', 'details': str(e)}), 500
@@ -7,40 +7,31 @@ from ..models import (
     Kit, Phone, SimCard, RightSensor, LeftSensor,
     Headphone, db, ComponentUsage, Distributor, Box
 )
+from ..serializers import usage_serializer, requested_fields
+from ..versioning import conditional
 
 @api_bp.route('/usage', methods=['GET'])
+@conditional('component_usage')
 def get_all_usages():
     """Get all component usage records"""
-    usages = ComponentUsage.query.all()
-    return jsonify([
-        {
-            'id': usage.id,
-            'component_id': usage.component_id,
-            'component_type': usage.component_type,
-            'kit_id': usage.kit_id,
-            'distributor_id': usage.distributor_id,
-            'start_time': usage.start_time,
-            'end_time': usage.end_time
-        } for usage in usages
-    ]), 200
+    try:
+        fields = requested_fields(usage_serializer)
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': usage_serializer.available}), 400
+    return jsonify(usage_serializer.dump(db.session, fields)), 200
 
 @api_bp.route('/usage/component/<string:component_id>', methods=['GET'])
+@conditional('component_usage')
 def get_usage_by_component(component_id):
     """Get usage records by component ID"""
-    usages = ComponentUsage.query.filter_by(component_id=component_id).all()
+    try:
+        fields = requested_fields(usage_serializer)
+    except ValueError as e:
+        return jsonify({'message': str(e), 'allowed': usage_serializer.available}), 400
+    usages = usage_serializer.dump(db.session, fields, ComponentUsage.component_id == component_id)
     if not usages:
         return jsonify({'message': f'No usage records found for component {component_id}'}), 404
-    return jsonify([
-        {
-            'id': usage.id,
-            'component_id': usage.component_id,
-            'component_type': usage.component_type,
-            'kit_id': usage.kit_id,
-            'distributor_id': usage.distributor_id,
-            'start_time': usage.start_time,
-            'end_time': usage.end_time
-        } for usage in usages
-    ]), 200
+    return jsonify(usages), 200
 
 @api_bp.route('/discard-rate', methods=['GET'])
 def get_discard_rate():
@@ -0,0 +1,90 @@
+"""
+Bounded in-process read cache for slowly changing reference data.
+
+``TTLCache`` evicts the least recently used entry once ``maxsize`` is
+reached and expires entries after ``ttl`` seconds, which bounds how stale
+another worker's copy can get. Writers in this process invalidate
+explicitly, so their own reads are never stale.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# sentinel for "not cached", since None is a valid loader result
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._data.clear()
+
+    def get(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader(key)`` on a miss.
+        A loader result of None (not found) is not cached."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader(key)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# id -> (id, name, status) row of the distributor table
+distributor_cache = TTLCache()
+
+caches = {
+    'distributor': distributor_cache,
+}
+
+
+def init_app(app):
+    for cache in caches.values():
+        cache.configure(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_TTL_SECONDS'])
@@ -0,0 +1,62 @@
+"""
+Flask CLI commands, e.g. ``flask --app medrhythms.app.run init-db``.
+"""
+import click
+
+from . import db, counters, reconcile
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Create any missing database tables."""
+        db.create_all()
+        app.logger.info('Database tables created successfully.')
+        click.echo('Database tables created.')
+
+    @app.cli.command('rebuild-counters')
+    def rebuild_counters():
+        """Recount the inventory_counter table from the kit and component tables."""
+        counts = counters.rebuild(db.session)
+        db.session.commit()
+        app.logger.info('Inventory counters rebuilt: %d rows', len(counts))
+        click.echo(f'Inventory counters rebuilt: {len(counts)} rows.')
+
+    @app.cli.command('verify-counters')
+    def verify_counters():
+        """Compare inventory_counter with a full recount; exits 1 on any difference."""
+        differences = counters.verify(db.session)
+        if not differences:
+            click.echo('Inventory counters match.')
+            return
+        for (kind, scope, status), (stored, actual) in differences.items():
+            click.echo(f'{kind} {scope or "-"} {status or "-"}: stored {stored}, actual {actual}')
+        raise SystemExit(1)
+
+    @app.cli.command('reconcile')
+    @click.option('--repair', is_flag=True, help='Fix the repairable inconsistencies.')
+    @click.option('--check', 'names', multiple=True, help='Run only this check (repeatable).')
+    @click.option('--batch-size', type=click.IntRange(min=1), default=None, help='Rows fixed per transaction.')
+    def reconcile_data(repair, names, batch_size):
+        """Report (and with --repair fix) drift between kits, components and usage records."""
+        try:
+            checks = reconcile.select_checks(names)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--check')
+
+        if repair:
+            fixed = reconcile.repair(db.session, checks, batch_size or app.config['RECONCILE_BATCH_SIZE'])
+            for name, count in fixed.items():
+                if count:
+                    click.echo(f'{name}: fixed {count}')
+            app.logger.info('Reconciliation repaired %d rows', sum(fixed.values()))
+
+        found = 0
+        for result in reconcile.report(db.session, checks, app.config['RECONCILE_SAMPLE_SIZE']):
+            if result['count']:
+                found += result['count']
+                sample = ', '.join(str(key) for key in result['sample'])
+                click.echo(f"{result['name']}: {result['count']} ({result['description']}) e.g. {sample}")
+        if found:
+            raise SystemExit(1)
+        click.echo('No inconsistencies found.')
@@ -0,0 +1,86 @@
+"""
+Content-negotiated gzip compression of responses.
+
+An ``after_request`` hook gzips JSON, NDJSON, CSV and text bodies with
+stdlib ``zlib`` when the client sends ``Accept-Encoding: gzip``. Buffered
+bodies are compressed only above ``COMPRESS_MIN_SIZE``. Streamed bodies
+(``send_file``, generators) are compressed chunk by chunk as they are sent.
+Anything else, such as the zip export or an already encoded body, passes
+through untouched.
+"""
+import zlib
+
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+})
+
+# wbits for a gzip header and trailer instead of a raw zlib stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def gzip_bytes(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_stream(chunks, level, close=None):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    try:
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        # the original body (e.g. a send_file wrapper) is no longer the response's, so close it here
+        if close is not None:
+            close()
+
+
+class Compressor:
+    def __init__(self, app):
+        self.level = app.config['COMPRESS_LEVEL']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+
+    def after_request(self, response):
+        if (request.method == 'HEAD'
+                or not 200 <= response.status_code < 300
+                or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            body = response.response
+            response.response = gzip_stream(
+                response.iter_encoded(), self.level, getattr(body, 'close', None)
+            )
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(gzip_bytes(data, self.level))
+
+        response.headers['Content-Encoding'] = 'gzip'
+        # the compressed bytes differ from the identity body, so a strong ETag no longer holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def init_app(app):
+    if app.config.get('COMPRESS_ENABLED'):
+        app.after_request(Compressor(app).after_request)
@@ -0,0 +1,61 @@
+"""
+Optimistic concurrency for kits and components.
+
+Both carry a ``version`` column mapped as SQLAlchemy's ``version_id_col``:
+every ORM UPDATE is issued as ``... WHERE id = ? AND version = ?`` and
+sets ``version = version + 1``. If another request changed the row after
+it was loaded, no row matches and the flush raises ``StaleDataError``;
+nothing waits on a lock.
+
+Clients may also send the version they last saw. ``expect_version`` turns
+a mismatch into a ``VersionConflict`` before anything is written. Either
+way the handler answers ``409 Conflict`` through ``conflict_response``.
+"""
+from flask import jsonify
+from sqlalchemy.orm.exc import StaleDataError
+
+
+class VersionConflict(Exception):
+    """The row is no longer at the version the client expected."""
+
+    def __init__(self, obj, expected):
+        self.kind = obj.__tablename__
+        self.id = obj.id
+        self.expected = expected
+        self.current = obj.version
+        self.status = obj.status
+        super().__init__(f'{self.kind} {self.id} is at version {self.current}, not {expected}')
+
+
+CONFLICT_ERRORS = (StaleDataError, VersionConflict)
+
+
+def expect_version(obj, expected):
+    """Raise VersionConflict unless ``expected`` is None or matches ``obj.version``."""
+    if expected is None:
+        return
+    try:
+        expected = int(expected)
+    except (TypeError, ValueError):
+        raise ValueError(f'version must be an integer, got {expected!r}')
+    if obj.version != expected:
+        raise VersionConflict(obj, expected)
+
+
+def conflict_response(error):
+    """409 body for a VersionConflict or a StaleDataError raised at flush."""
+    if isinstance(error, VersionConflict):
+        body = {
+            'message': f'{error.kind} {error.id} was changed by another request; reload it and retry',
+            'type': error.kind,
+            'id': error.id,
+            'expected_version': error.expected,
+            'current_version': error.current,
+            'current_status': error.status,
+        }
+    else:
+        body = {
+            'message': 'The record was changed by another request while this one ran; reload it and retry',
+            'details': str(error),
+        }
+    return jsonify(body), 409
@@ -0,0 +1,132 @@
+"""
+Configuration objects for create_app.
+
+``create_app()`` without arguments reads ``Config.from_env()``; tests and
+tools pass a config object or a plain dict instead, e.g.
+``create_app(TestingConfig)`` for an in-memory SQLite database.
+"""
+import os
+
+# production pool defaults for server databases, overridable per key through
+# SQLALCHEMY_ENGINE_OPTIONS or the DB_POOL_* environment variables
+DEFAULT_ENGINE_OPTIONS = {
+    'pool_pre_ping': True,      # drop connections MySQL closed while idle
+    'pool_recycle': 1800,       # stay well below MySQL's wait_timeout
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+}
+
+ENGINE_OPTION_ENV = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+}
+
+
+def engine_options(database_uri, configured=None):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS: defaults, then environment, then explicit settings.
+    SQLite keeps SQLAlchemy's own pooling since it has no server connections to manage.
+    """
+    if not database_uri or database_uri.startswith('sqlite'):
+        return dict(configured or {})
+
+    from .metrics import InstrumentedQueuePool
+
+    options = dict(DEFAULT_ENGINE_OPTIONS, poolclass=InstrumentedQueuePool)
+    for key, env_name in ENGINE_OPTION_ENV.items():
+        if os.getenv(env_name):
+            options[key] = int(os.getenv(env_name))
+    options.update(configured or {})
+    return options
+
+
+def is_memory_database(database_uri):
+    return database_uri in ('sqlite://', 'sqlite:///:memory:')
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = None
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # create tables on startup; otherwise run `flask init-db` once per database
+    CREATE_SCHEMA = False
+
+    LOG_DIR = 'logs'
+    LOG_TO_FILE = True
+    LOG_LEVEL = 'INFO'
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 10
+
+    IMPORT_CHUNK_SIZE = 1000
+
+    # in-process cache for reference data such as distributors (see cache.py)
+    CACHE_TTL_SECONDS = 60
+    CACHE_MAX_ENTRIES = 1024
+
+    # requests issuing more statements than this are logged as suspected N+1 patterns
+    N_PLUS_ONE_QUERY_THRESHOLD = 20
+
+    # statements slower than this go to LOG_DIR/slow_query.log (None disables it)
+    SLOW_QUERY_THRESHOLD_MS = 200
+    SLOW_QUERY_EXPLAIN = False
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+    # profile requests sent with "X-Profile: 1" (see app/profiling.py)
+    PROFILING_ENABLED = False
+    PROFILE_HEADER = 'X-Profile'
+    PROFILE_MAX_PER_MINUTE = 2
+    PROFILE_TOP_N = 30
+    PROFILE_DIR = None  # defaults to LOG_DIR/profiles
+
+    # gzip JSON/CSV/text responses for clients sending Accept-Encoding: gzip
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+
+    # /api/typeahead: rebuild when another process changed ids, checked at most this often
+    TYPEAHEAD_REFRESH_SECONDS = 30
+    TYPEAHEAD_MAX_RESULTS = 50
+
+    # /api/events change feed; each open stream holds a worker thread
+    EVENTS_BUFFER_SIZE = 1000
+    EVENTS_MAX_STREAMS = 2  # per worker, keep below GUNICORN_THREADS
+    EVENTS_STREAM_SECONDS = 300  # clients reconnect with Last-Event-ID afterwards
+    EVENTS_HEARTBEAT_SECONDS = 15
+    EVENTS_RESYNC_SECONDS = 5  # how often streams look for changes made by other processes
+    EVENTS_RETRY_MS = 2000
+
+    # /api/batch: sub-requests per call, and threads for {"parallel": true} read-only batches
+    BATCH_MAX_REQUESTS = 20
+    BATCH_MAX_WORKERS = 4  # each holds a pooled connection while it runs
+
+    # /api/scan
+    SCAN_MAX_IDS = 1000
+
+    # /api/reconcile and `flask reconcile`
+    RECONCILE_BATCH_SIZE = 1000  # rows fixed per transaction
+    RECONCILE_SAMPLE_SIZE = 20  # ids listed per failing check
+
+    # read replicas for GET requests under /api (see replicas.py); empty keeps all reads on the primary
+    REPLICA_DATABASE_URIS = ()
+    REPLICA_READ_YOUR_WRITES_SECONDS = 5
+    REPLICA_MAX_LAG_SECONDS = None  # skip replicas further behind than this
+    REPLICA_LAG_CHECK_SECONDS = 5
+
+    @classmethod
+    def from_env(cls):
+        """Settings taken from the environment (and .env) for the deployed app."""
+        settings = {'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL')}
+        if os.getenv('DATABASE_REPLICA_URLS'):
+            settings['REPLICA_DATABASE_URIS'] = [
+                uri.strip() for uri in os.getenv('DATABASE_REPLICA_URLS').split(',') if uri.strip()
+            ]
+        return settings
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    LOG_TO_FILE = False
@@ -0,0 +1,221 @@
+"""
+Inventory status counters for the dashboard summary.
+
+``inventory_counter`` holds one row per (kind, scope, status): kind is
+``kit`` or a component table, scope is the kit's distributor id ('' for
+components and undistributed kits). Every ORM flush that creates,
+deletes or changes the status of a kit or component, or moves a kit to
+another distributor, adds its +1/-1 deltas to the transaction's total.
+The total is applied once, just before commit, on the same connection, so
+the counts commit or roll back with the write itself and the shared
+counter rows stay locked only for the end of the transaction. Bulk upserts that bypass
+the ORM (the import engine) compute their deltas with ``row_deltas``
+before overwriting and apply them the same way.
+
+``rebuild`` recounts everything from the source tables and ``verify``
+reports any drift; both are exposed as CLI commands.
+"""
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select, update, insert, delete
+
+from . import db
+from .models import InventoryCounter, Kit, Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+from .versioning import bump_versions
+
+COMPONENT_MODELS = (Phone, SimCard, RightSensor, LeftSensor, Headphone, Box)
+COUNTED_MODELS = (Kit, *COMPONENT_MODELS)
+
+# size of the IN lists used to read the rows an import is about to overwrite
+LOOKUP_BATCH_SIZE = 500
+
+
+def _key(kind, status, distributor_id=None):
+    return kind, distributor_id or '', status or ''
+
+
+def _scope_column(model):
+    return model.distributor_id if model is Kit else None
+
+
+def _old_value(state, name):
+    """Value of ``name`` before this flush, or None if it was never loaded."""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _upsert_statement(dialect_name):
+    """INSERT a count, or add to an existing one, in one atomic statement."""
+    table = InventoryCounter.__table__
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted['count'])
+    if dialect_name in ('sqlite', 'postgresql'):
+        if dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=['kind', 'scope', 'status'], set_={'count': table.c.count + stmt.excluded['count']}
+        )
+    return None
+
+
+def apply_deltas(connection, deltas):
+    """Add ``{(kind, scope, status): delta}`` to the counters on ``connection``."""
+    # a fixed order keeps concurrent writers from locking counter rows in opposite orders
+    rows = [
+        {'kind': kind, 'scope': scope, 'status': status, 'count': delta}
+        for (kind, scope, status), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+
+    stmt = _upsert_statement(connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt, rows)
+        return
+
+    table = InventoryCounter.__table__
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(table.c.kind == row['kind'], table.c.scope == row['scope'], table.c.status == row['status'])
+            .values(count=table.c.count + row['count'])
+        )
+        if not result.rowcount:
+            connection.execute(insert(table).values(**row))
+
+
+def row_deltas(connection, model, rows):
+    """Deltas for upserting ``rows`` (full column dicts) into ``model``'s table, read before the write."""
+    if model not in COUNTED_MODELS:
+        return Counter()
+    kind = model.__tablename__
+    scope_column = _scope_column(model)
+    deltas = Counter()
+
+    # a chunk may repeat an id; only its last row survives the upsert
+    rows = list({row['id']: row for row in rows}.values())
+    ids = [row['id'] for row in rows]
+    columns = [model.id, model.status] + ([scope_column] if scope_column is not None else [])
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        stmt = select(*columns).where(model.id.in_(ids[start:start + LOOKUP_BATCH_SIZE]))
+        for existing in connection.execute(stmt):
+            deltas[_key(kind, existing.status, existing[2] if scope_column is not None else None)] -= 1
+
+    for row in rows:
+        deltas[_key(kind, row['status'], row.get('distributor_id') if scope_column is not None else None)] += 1
+    return deltas
+
+
+def _after_flush(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if type(obj) in COUNTED_MODELS:
+            deltas[_key(obj.__tablename__, obj.status, getattr(obj, 'distributor_id', None))] += 1
+
+    for obj in session.deleted:
+        if type(obj) in COUNTED_MODELS:
+            state = inspect(obj)
+            deltas[_key(obj.__tablename__, _old_value(state, 'status'),
+                        _old_value(state, 'distributor_id') if type(obj) is Kit else None)] -= 1
+
+    for obj in session.dirty:
+        if type(obj) not in COUNTED_MODELS:
+            continue
+        state = inspect(obj)
+        watched = ('status', 'distributor_id') if type(obj) is Kit else ('status',)
+        if not any(state.attrs[name].history.has_changes() for name in watched):
+            continue
+        is_kit = type(obj) is Kit
+        deltas[_key(obj.__tablename__, _old_value(state, 'status'),
+                    _old_value(state, 'distributor_id') if is_kit else None)] -= 1
+        deltas[_key(obj.__tablename__, obj.status, obj.distributor_id if is_kit else None)] += 1
+
+    if deltas:
+        session.info.setdefault('counter_deltas', Counter()).update(deltas)
+
+
+def _before_commit(session):
+    # commit flushes after this hook, so flush first to collect every change
+    session.flush()
+    deltas = session.info.pop('counter_deltas', None)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def _after_rollback(session):
+    session.info.pop('counter_deltas', None)
+
+
+def actual_counts(session):
+    """Recount every (kind, scope, status) from the source tables."""
+    counts = Counter()
+    for model in COUNTED_MODELS:
+        scope_column = _scope_column(model)
+        group = [model.status] + ([scope_column] if scope_column is not None else [])
+        for row in session.execute(select(*group, func.count()).group_by(*group)):
+            counts[_key(model.__tablename__, row[0], row[1] if scope_column is not None else None)] += row[-1]
+    return counts
+
+
+def stored_counts(session):
+    rows = session.execute(select(
+        InventoryCounter.kind, InventoryCounter.scope, InventoryCounter.status, InventoryCounter.count
+    ))
+    return Counter({(kind, scope, status): count for kind, scope, status, count in rows if count})
+
+
+def verify(session):
+    """``{(kind, scope, status): (stored, actual)}`` for every counter that is off."""
+    stored, actual = stored_counts(session), actual_counts(session)
+    return {
+        key: (stored[key], actual[key])
+        for key in sorted(set(stored) | set(actual))
+        if stored[key] != actual[key]
+    }
+
+
+def rebuild(session):
+    """Replace every counter with a fresh count and bump the counted tables' versions, in the caller's transaction."""
+    counts = actual_counts(session)
+    session.execute(delete(InventoryCounter))
+    if counts:
+        session.execute(insert(InventoryCounter), [
+            {'kind': kind, 'scope': scope, 'status': status, 'count': count}
+            for (kind, scope, status), count in counts.items()
+        ])
+    # /api/summary's ETag comes from these tables' versions; without a bump clients keep their stale 304s
+    bump_versions(session.connection(), [model.__tablename__ for model in COUNTED_MODELS])
+    return counts
+
+
+def summary(session):
+    """Dashboard summary from the counter table alone."""
+    components = {model.__tablename__: {} for model in COMPONENT_MODELS}
+    kits_by_status, kits_by_distributor = {}, {}
+    for (kind, scope, status), count in sorted(stored_counts(session).items()):
+        if kind == Kit.__tablename__:
+            kits_by_status[status] = kits_by_status.get(status, 0) + count
+            if scope:
+                kits_by_distributor.setdefault(scope, {})[status] = count
+        else:
+            components[kind][status] = count
+    return {
+        'components': components,
+        'kits': {'by_status': kits_by_status, 'by_distributor': kits_by_distributor},
+    }
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
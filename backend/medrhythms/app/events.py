@@ -0,0 +1,194 @@
+"""
+Change feed for ``GET /api/events`` (server-sent events).
+
+Write handlers call ``emit(type, **data)`` while they hold their changes.
+The events are kept on the session and published to the worker's
+``EventBroker`` when that transaction commits; a rollback drops them.
+
+The broker keeps the last ``EVENTS_BUFFER_SIZE`` events in a ring buffer.
+Every open stream waits on one condition, so a publish wakes all of them
+and each stream reads whatever is newer than its own position. Event ids
+are ``<broker token>-<sequence>``: a client reconnecting with
+``Last-Event-ID`` resumes where it stopped, as long as it reconnects to the
+same worker and the buffer still holds that position.
+
+Each worker only sees its own writes. Changes made elsewhere (other
+workers, ``/api/import``) are noticed through ``table_version``: streams
+compare the counters at most every ``EVENTS_RESYNC_SECONDS`` and, when
+they moved further than this worker's own commits explain, publish a
+``resync`` event naming the changed tables. Clients answer it by
+refetching those lists. The same event is sent to a client whose
+``Last-Event-ID`` can no longer be resumed.
+"""
+import json
+import secrets
+import threading
+import time
+from collections import Counter, deque
+
+from sqlalchemy import event
+
+from . import db
+
+# tables whose changes the feed reports; usage history follows from the kit events
+WATCHED_TABLES = ('kit', 'distributor', 'phone', 'sim_card', 'right_sensor', 'left_sensor', 'headphone', 'box')
+
+
+def format_event(event_type, data, event_id=None):
+    """One server-sent event frame."""
+    lines = [f'id: {event_id}'] if event_id else []
+    lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':'), default=str))
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventBroker:
+    """Per-process ring buffer of published events, with a condition streams wait on."""
+
+    def __init__(self, buffer_size=1000):
+        self.token = secrets.token_hex(4)
+        self._events = deque(maxlen=buffer_size)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self.streams = 0
+
+        # table_version counters at the last check, and bumps committed here since
+        self._check_lock = threading.Lock()
+        self._checked_at = None
+        self._versions = None
+        self._local_bumps = Counter()
+
+    @property
+    def buffer_size(self):
+        return self._events.maxlen
+
+    @buffer_size.setter
+    def buffer_size(self, size):
+        with self._condition:
+            self._events = deque(self._events, maxlen=size)
+
+    def publish(self, events):
+        """Append ``(type, data)`` pairs and wake every waiting stream."""
+        with self._condition:
+            for event_type, data in events:
+                self._sequence += 1
+                self._events.append((self._sequence, format_event(
+                    event_type, data, f'{self.token}-{self._sequence}'
+                ), event_type))
+            self._condition.notify_all()
+
+    def position(self, last_event_id=None):
+        """
+        Sequence to stream from, and whether the client missed events.
+
+        Without ``last_event_id`` the client starts from now. An id from another
+        process, or one that has already left the buffer, counts as missed.
+        """
+        with self._condition:
+            if not last_event_id:
+                return self._sequence, False
+            token, _, sequence = last_event_id.rpartition('-')
+            if token != self.token or not sequence.isdigit() or int(sequence) > self._sequence:
+                return self._sequence, True
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+            return int(sequence), int(sequence) + 1 < oldest
+
+    def open_stream(self, limit):
+        """Count a new stream, unless ``limit`` are already open."""
+        with self._condition:
+            if self.streams >= limit:
+                return False
+            self.streams += 1
+            return True
+
+    def close_stream(self):
+        with self._condition:
+            self.streams -= 1
+
+    def wait(self, after, timeout):
+        """Events published after sequence ``after``, waiting up to ``timeout`` seconds for one."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after, timeout)
+            return [entry for entry in self._events if entry[0] > after]
+
+    def committed(self, bumps):
+        """Record table_version bumps made by a commit in this process."""
+        with self._check_lock:
+            self._local_bumps.update(bumps)
+
+    def check_versions(self, interval):
+        """
+        Publish ``resync`` if watched tables changed outside this process.
+        Runs at most every ``interval`` seconds, in one stream at a time.
+        """
+        from .versioning import current_versions
+
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            local_bumps, self._local_bumps = self._local_bumps, Counter()
+            versions = current_versions(WATCHED_TABLES)
+            previous, self._versions = self._versions, versions
+        finally:
+            self._check_lock.release()
+
+        if previous is None:
+            return
+        changed = [
+            table for table in WATCHED_TABLES
+            if versions[table] - previous[table] > local_bumps[table]
+        ]
+        if changed:
+            self.publish([('resync', {'tables': changed})])
+
+    def stats(self):
+        with self._condition:
+            return {
+                'streams': self.streams,
+                'buffered': len(self._events),
+                'buffer_size': self._events.maxlen,
+                'last_event_id': f'{self.token}-{self._sequence}',
+            }
+
+
+broker = EventBroker()
+
+
+def emit(event_type, **data):
+    """Queue an event on the current transaction; it is published when that commits."""
+    db.session.info.setdefault('pending_events', []).append((event_type, data))
+
+
+def _after_flush(session, flush_context):
+    # versioning bumps each changed table once per commit; count the same way
+    session.info.setdefault('event_tables', set()).update(
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, '__table__', None) is not None and obj.__table__.name in WATCHED_TABLES
+    )
+
+
+def _after_commit(session):
+    tables = session.info.pop('event_tables', None)
+    if tables:
+        broker.committed(Counter(tables))
+    events = session.info.pop('pending_events', None)
+    if events:
+        broker.publish(events)
+
+
+def _after_rollback(session):
+    session.info.pop('event_tables', None)
+    session.info.pop('pending_events', None)
+
+
+def init_app(app):
+    broker.buffer_size = app.config['EVENTS_BUFFER_SIZE']
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
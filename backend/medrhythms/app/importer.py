@@ -0,0 +1,416 @@
+"""
+Bulk import engine behind /api/import.
+
+Rows are upserted in chunks with dialect-native statements
+(``INSERT ... ON DUPLICATE KEY UPDATE`` on MySQL, ``INSERT ... ON CONFLICT``
+on SQLite/PostgreSQL) and committed chunk by chunk, so a large restore never
+holds more than one chunk in the session.
+
+Three file formats are read: the JSON document written by ``/exportdb``,
+NDJSON, one ``{"table": ..., "row": {...}}`` object per line, and the zip
+of per-table CSVs written by ``/exportdb?format=csv``. NDJSON and CSV are
+parsed record by record so a restore runs in constant memory.
+"""
+import csv
+import io
+import json
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import DateTime, Integer, select
+
+from . import db
+from .cache import distributor_cache
+from .versioning import bump_versions
+from .counters import row_deltas, apply_deltas
+from .models import (
+    Kit, Distributor, ComponentUsage,
+    Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+)
+
+# Export names in foreign-key order: distributors, kits, components, usages
+IMPORT_ORDER = [
+    ('distributors', Distributor),
+    ('kits', Kit),
+    ('phones', Phone),
+    ('sim_cards', SimCard),
+    ('right_sensors', RightSensor),
+    ('left_sensors', LeftSensor),
+    ('headphones', Headphone),
+    ('boxes', Box),
+    ('component_usages', ComponentUsage),
+]
+
+IMPORT_MODELS = dict(IMPORT_ORDER)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# foreign keys checked by the dry run: table -> [(column, referenced table)]
+IMPORT_REFERENCES = {
+    'kits': [('distributor_id', 'distributors')],
+    'phones': [('kit_id', 'kits')],
+    'sim_cards': [('kit_id', 'kits')],
+    'right_sensors': [('kit_id', 'kits')],
+    'left_sensors': [('kit_id', 'kits')],
+    'headphones': [('kit_id', 'kits')],
+    'boxes': [('kit_id', 'kits')],
+    'component_usages': [('kit_id', 'kits'), ('distributor_id', 'distributors')],
+}
+
+# component_usage.component_type -> component table
+USAGE_COMPONENT_TABLES = {
+    'phone': 'phones',
+    'sim_card': 'sim_cards',
+    'right_sensor': 'right_sensors',
+    'left_sensor': 'left_sensors',
+    'headphone': 'headphones',
+    'box': 'boxes',
+}
+
+# size of the IN lists used to look up existing keys
+LOOKUP_BATCH_SIZE = 500
+
+MAX_REPORTED_ERRORS = 100
+
+# optimistic-lock column of kits and components (see concurrency.py)
+VERSION_COLUMN = 'version'
+
+
+def parse_datetime(value):
+    """Parse a timestamp as written by ``serialize_model`` (``str(datetime)``)."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def coerce_row(table, row):
+    """Build a full column -> value dict for ``table`` from an exported row.
+
+    Every column is always present so a chunk can be sent as one executemany;
+    missing columns fall back to their scalar default or NULL.
+    """
+    values = {}
+    for column in table.columns:
+        if column.name in row:
+            value = row[column.name]
+        elif column.default is not None and column.default.is_scalar:
+            value = column.default.arg
+        else:
+            value = None
+
+        if isinstance(column.type, DateTime):
+            value = parse_datetime(value)
+        elif isinstance(column.type, Integer) and value not in (None, ''):
+            value = int(value)
+        values[column.name] = value
+    return values
+
+
+def iter_json_document(data):
+    """Yield ``(table_name, row)`` pairs from an exported JSON document in FK order."""
+    for table_name, _ in IMPORT_ORDER:
+        for row in data.get(table_name) or []:
+            yield table_name, row
+
+
+def iter_ndjson(stream, skip=0):
+    """Yield ``(table_name, row)`` pairs from an NDJSON byte stream.
+
+    The first ``skip`` records are passed over without being decoded, which
+    is how an interrupted import resumes after its last committed chunk.
+    """
+    index = 0
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        index += 1
+        if index <= skip:
+            continue
+
+        try:
+            record = json.loads(line)
+            yield record['table'], record['row']
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f'Invalid NDJSON record on line {line_number}: {e}')
+
+
+def iter_csv_zip(stream):
+    """Yield ``(table_name, row)`` pairs from a zip of per-table CSVs in FK order.
+
+    Each member is streamed through ``csv.DictReader``. ``export_csv`` writes
+    NULL as an empty string, so blanks become None in nullable columns.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        members = set(archive.namelist())
+        for table_name, model in IMPORT_ORDER:
+            member = f'{table_name}.csv'
+            if member not in members:
+                continue
+
+            nullable = {c.name for c in model.__table__.columns if c.nullable}
+            with archive.open(member) as raw:
+                reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+                for row in reader:
+                    yield table_name, {
+                        key: None if value == '' and key in nullable else value
+                        for key, value in row.items()
+                    }
+
+
+def _update_values(table, update_columns, incoming):
+    # an overwrite is a change like any other: optimistic-lock versions move forward, never back
+    return {
+        name: table.c.version + 1 if name == VERSION_COLUMN else incoming[name]
+        for name in update_columns
+    }
+
+
+def build_upsert(table, dialect_name):
+    """Return a dialect-native upsert for ``table``, or None if unsupported."""
+    update_columns = [c.name for c in table.columns if not c.primary_key]
+
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(_update_values(table, update_columns, stmt.inserted))
+
+    if dialect_name in ('sqlite', 'postgresql'):
+        if dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key.columns],
+            set_=_update_values(table, update_columns, stmt.excluded)
+        )
+
+    return None
+
+
+class ImportEngine:
+    """Upserts ``(table_name, row)`` records in committed chunks.
+
+    Records must arrive grouped by table in FK order (see ``IMPORT_ORDER``);
+    the buffer is flushed whenever the table changes or the chunk is full.
+    """
+
+    def __init__(self, session=None, chunk_size=None, progress=None):
+        self.session = session or db.session
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.progress = progress
+        self.counts = OrderedDict()
+        self.chunks = 0
+        self.committed = 0
+        self._statements = {}
+
+    def load(self, records):
+        """Import every record and return the per-table row counts."""
+        current_table = None
+        buffer = []
+
+        for table_name, row in records:
+            if table_name not in IMPORT_MODELS:
+                raise ValueError(f'Unknown table in import: {table_name}')
+
+            if buffer and (table_name != current_table or len(buffer) >= self.chunk_size):
+                self._flush(current_table, buffer)
+                buffer = []
+
+            current_table = table_name
+            buffer.append(coerce_row(IMPORT_MODELS[table_name].__table__, row))
+
+        if buffer:
+            self._flush(current_table, buffer)
+
+        return self.counts
+
+    def _statement(self, model):
+        if model not in self._statements:
+            dialect_name = self.session.get_bind(mapper=model).dialect.name
+            self._statements[model] = build_upsert(model.__table__, dialect_name)
+        return self._statements[model]
+
+    def _flush(self, table_name, rows):
+        model = IMPORT_MODELS[table_name]
+        stmt = self._statement(model)
+
+        if stmt is not None:
+            connection = self.session.connection()
+            # Core statements skip the ORM flush hooks: read what the chunk overwrites for the
+            # status counters, then bump the change counter, all in the chunk's transaction
+            deltas = row_deltas(connection, model, rows)
+            self.session.execute(stmt, rows)
+            apply_deltas(connection, deltas)
+            bump_versions(connection, [model.__tablename__])
+        else:
+            # no native upsert for this dialect, fall back to per-row merge
+            # without the imported version, so merge neither checks nor rewinds it
+            for row in rows:
+                self.session.merge(model(**{k: v for k, v in row.items() if k != VERSION_COLUMN}))
+
+        self.session.commit()
+        if model is Distributor:
+            distributor_cache.invalidate()
+
+        self.chunks += 1
+        self.committed += len(rows)
+        self.counts[table_name] = self.counts.get(table_name, 0) + len(rows)
+        current_app.logger.info(
+            'Import chunk %d committed: %d %s rows (%d total)',
+            self.chunks, len(rows), table_name, self.counts[table_name]
+        )
+        if self.progress:
+            self.progress(table_name, self.counts[table_name])
+
+
+class ImportValidator:
+    """Dry run of an import: validates every record without writing anything.
+
+    Primary keys and referenced keys are collected into in-memory sets while
+    the file streams past; keys not found in the file are then resolved
+    against the database with batched IN queries, which also split each
+    table's rows into inserts and updates.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+        self.error_count = 0
+        self.errors = []
+        self._keys = {name: set() for name in IMPORT_MODELS}
+        self._rows = dict.fromkeys(IMPORT_MODELS, 0)
+        self._invalid = dict.fromkeys(IMPORT_MODELS, 0)
+        # rows without an autoincrement key: always inserts, the database assigns the key
+        self._keyless = dict.fromkeys(IMPORT_MODELS, 0)
+        # referenced table -> {key: (table, row, column)} for the first reference
+        self._references = {name: {} for name in IMPORT_MODELS}
+        self._emails = {}
+
+    def validate(self, records):
+        """Check every record and return the dry-run report."""
+        for table_name, row in records:
+            if table_name not in IMPORT_MODELS:
+                self._error(table_name, None, None, None, 'Unknown table')
+                continue
+
+            self._rows[table_name] += 1
+            self._check_row(table_name, self._rows[table_name], row)
+
+        self._check_references()
+        return self.report()
+
+    def report(self):
+        tables = {}
+        for table_name, model in IMPORT_ORDER:
+            if not self._rows[table_name]:
+                continue
+            keys = self._keys[table_name]
+            updates = len(self._existing_keys(model, keys))
+            keyless = self._keyless[table_name]
+            tables[table_name] = {
+                'rows': self._rows[table_name],
+                'inserts': len(keys) - updates + keyless,
+                'updates': updates,
+                'invalid': self._invalid[table_name],
+                'duplicates': self._rows[table_name] - self._invalid[table_name] - len(keys) - keyless,
+            }
+
+        return {
+            'valid': self.error_count == 0,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'tables': tables,
+        }
+
+    def _error(self, table_name, row_number, column, value, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({
+                'table': table_name,
+                'row': row_number,
+                'column': column,
+                'value': value,
+                'message': message,
+            })
+
+    def _check_row(self, table_name, row_number, row):
+        table = IMPORT_MODELS[table_name].__table__
+        try:
+            values = coerce_row(table, row)
+        except (ValueError, TypeError) as e:
+            self._error(table_name, row_number, None, None, f'Invalid value: {e}')
+            self._invalid[table_name] += 1
+            return
+
+        for column in table.columns:
+            if values[column.name] is None and not column.nullable and column is not table.autoincrement_column:
+                self._error(table_name, row_number, column.name, None, 'Value is required')
+                self._invalid[table_name] += 1
+                return
+
+        pk_column = table.primary_key.columns[0].name
+        if values[pk_column] is None:
+            self._keyless[table_name] += 1
+        else:
+            self._keys[table_name].add(values[pk_column])
+
+        for column, referenced in IMPORT_REFERENCES.get(table_name, []):
+            self._reference(referenced, values[column], table_name, row_number, column)
+
+        if table_name == 'component_usages':
+            component_table = USAGE_COMPONENT_TABLES.get(values['component_type'])
+            if component_table is None:
+                self._error(table_name, row_number, 'component_type', values['component_type'],
+                            'Unknown component type')
+            else:
+                self._reference(component_table, values['component_id'], table_name, row_number, 'component_id')
+
+        if table_name == 'distributors':
+            owner = self._emails.setdefault(values['email'], values['id'])
+            if owner != values['id']:
+                self._error(table_name, row_number, 'email', values['email'],
+                            f'Email already used by distributor {owner} in this file')
+
+    def _reference(self, referenced, value, table_name, row_number, column):
+        if value is not None:
+            self._references[referenced].setdefault(value, (table_name, row_number, column))
+
+    def _check_references(self):
+        for referenced, references in self._references.items():
+            missing = set(references) - self._keys[referenced]
+            if not missing:
+                continue
+            missing -= self._existing_keys(IMPORT_MODELS[referenced], missing)
+            for value in missing:
+                table_name, row_number, column = references[value]
+                self._error(table_name, row_number, column, value,
+                            f'References a {referenced} row that is not in the file or the database')
+
+        # distributor.email is unique: a row may not take an email owned by another id
+        distributor_id = Distributor.__table__.c.id
+        distributor_email = Distributor.__table__.c.email
+        emails = list(self._emails)
+        for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+            stmt = select(distributor_id, distributor_email).where(
+                distributor_email.in_(emails[start:start + LOOKUP_BATCH_SIZE])
+            )
+            for existing_id, email in self.session.execute(stmt):
+                if existing_id != self._emails[email]:
+                    self._error('distributors', None, 'email', email,
+                                f'Email already used by distributor {existing_id} in the database')
+
+    def _existing_keys(self, model, keys):
+        """Return the subset of ``keys`` already present in ``model``'s table."""
+        pk_column = model.__table__.primary_key.columns[0]
+        keys = list(keys)
+        existing = set()
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            stmt = select(pk_column).where(pk_column.in_(keys[start:start + LOOKUP_BATCH_SIZE]))
+            existing.update(self.session.execute(stmt).scalars())
+        return existing
@@ -0,0 +1,68 @@
+"""
+Non-blocking file logging.
+
+Request threads only put records on a queue through a ``QueueHandler``. A
+``QueueListener`` thread per log file does the formatting-to-disk and the
+rotation, so a rotating file is never renamed inside a request.
+
+Threads do not survive ``fork()``: a server that preloads the app and then
+forks workers must call ``restart_after_fork`` in each worker, or the
+worker's records would queue up with nothing writing them.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_handlers = {}
+_listeners = {}
+_lock = threading.Lock()
+
+
+def queued_file_handler(path, formatter, level=logging.INFO, max_bytes=10 * 1024 * 1024, backup_count=10):
+    """
+    Return the QueueHandler feeding the rotating file at ``path``.
+    The listener thread is started once per file and stopped at exit, flushing the queue.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        if path in _handlers:
+            return _handlers[path]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        file_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        handler = QueueHandler(log_queue)
+        handler.setLevel(level)
+        _handlers[path] = handler
+        _listeners[path] = listener
+        return handler
+
+
+def restart_after_fork():
+    """Give a forked worker its own queue and listener thread for every log file."""
+    with _lock:
+        for path, handler in _handlers.items():
+            inherited = _listeners[path]
+            atexit.unregister(inherited.stop)
+
+            log_queue = queue.SimpleQueue()
+            listener = QueueListener(log_queue, *inherited.handlers)
+            listener.start()
+            atexit.register(listener.stop)
+
+            handler.queue = log_queue
+            _listeners[path] = listener
+
+
+def attach(logger, handler):
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
@@ -0,0 +1,230 @@
+"""
+Runtime metrics for the inventory API.
+
+``InstrumentedQueuePool`` is a ``QueuePool`` that records how long each
+checkout waits for a connection, so the pool can be sized against real
+traffic. ``pool_snapshot`` reports the wait times together with the pool's
+checked-out and overflow counts.
+
+``request_metrics`` keeps per-endpoint wall time, DB time and statement
+counts. The counts come from engine cursor events installed by
+``init_app`` and are accumulated on ``flask.g`` for the current request.
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# number of recent samples kept for percentile estimates
+SAMPLE_WINDOW = 1000
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class WaitStats:
+    """Thread-safe counters for connection checkout wait times (milliseconds)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=SAMPLE_WINDOW)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def record(self, elapsed_ms, timed_out=False):
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._samples.append(round(elapsed_ms, 3))
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            return {
+                'checkouts': self.count,
+                'timeouts': self.timeouts,
+                'avg_ms': round(self.total_ms / self.count, 3) if self.count else None,
+                'max_ms': round(self.max_ms, 3),
+                'p50_ms': percentile(samples, 0.50),
+                'p95_ms': percentile(samples, 0.95),
+                'p99_ms': percentile(samples, 0.99),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout, including waits for a free slot."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = WaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record((time.perf_counter() - start) * 1000, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        # keep the history across engine.dispose()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def pool_snapshot(engine):
+    """Describe the current state of ``engine``'s connection pool."""
+    pool = engine.pool
+    snapshot = {'pool': type(pool).__name__}
+    for name in ('size', 'checkedout', 'checkedin', 'overflow'):
+        if hasattr(pool, name):
+            snapshot[name] = getattr(pool, name)()
+    if hasattr(pool, '_max_overflow'):
+        snapshot['max_overflow'] = pool._max_overflow
+    if hasattr(pool, 'wait_stats'):
+        snapshot['checkout_wait'] = pool.wait_stats.snapshot()
+    return snapshot
+
+
+# upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class EndpointStats:
+    """Rolling latency histogram and query counts for one endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=SAMPLE_WINDOW)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.n_plus_one = 0
+
+    def record(self, wall_ms, db_ms, queries, status_code, suspected_n_plus_one):
+        bucket = len(LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if wall_ms <= bound:
+                bucket = index
+                break
+
+        with self._lock:
+            self.count += 1
+            self.buckets[bucket] += 1
+            self._samples.append(round(wall_ms, 3))
+            self.total_ms += wall_ms
+            self.db_ms += db_ms
+            self.queries += queries
+            self.max_queries = max(self.max_queries, queries)
+            if status_code >= 500:
+                self.errors += 1
+            if suspected_n_plus_one:
+                self.n_plus_one += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            labels = [f'le_{bound}ms' for bound in LATENCY_BUCKETS_MS] + ['inf']
+            return {
+                'requests': self.count,
+                'errors': self.errors,
+                'avg_ms': round(self.total_ms / self.count, 3) if self.count else None,
+                'p50_ms': percentile(samples, 0.50),
+                'p95_ms': percentile(samples, 0.95),
+                'p99_ms': percentile(samples, 0.99),
+                'avg_db_ms': round(self.db_ms / self.count, 3) if self.count else None,
+                'avg_queries': round(self.queries / self.count, 2) if self.count else None,
+                'max_queries': self.max_queries,
+                'suspected_n_plus_one': self.n_plus_one,
+                'histogram': dict(zip(labels, self.buckets)),
+            }
+
+
+class RequestMetrics:
+    """Registry of ``EndpointStats`` keyed by endpoint name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, *args):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self._endpoints.setdefault(endpoint, EndpointStats())
+        stats.record(*args)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {name: stats.snapshot() for name, stats in sorted(endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+def start_request():
+    """Begin counting wall time, DB time and statements for the current request."""
+    g.metrics_started = time.perf_counter()
+    g.query_count = 0
+    g.query_time = 0.0
+    g.query_statements = Counter()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the statement's own context: a statement that raises never reaches after_cursor_execute,
+    # and a start time left on the pooled connection would skew every later one
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_app_context() and 'metrics_started' in g:
+        g.query_count += 1
+        g.query_time += elapsed
+        g.query_statements[statement] += 1
+
+
+def install_query_hooks(engine):
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app):
+    """Install statement counting on every engine of ``app``."""
+    from . import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            install_query_hooks(engine)
@@ -1,10 +1,20 @@
 from datetime import datetime
 from . import db
-from sqlalchemy.orm import validates
+from .cache import distributor_cache
+from .events import emit
+from .concurrency import expect_version, CONFLICT_ERRORS
+from sqlalchemy.orm import validates, declared_attr
 
 class Kit(db.Model):
 
     __tablename__ = 'kit'
+    __table_args__ = (
+        # /kits/search filters, each read as an index range already in (created_at, id) order;
+        # id is implicit in InnoDB secondary indexes but SQLite needs it spelled out
+        db.Index('idx_kit_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('idx_kit_distributor_created_at', 'distributor_id', 'created_at', 'id'),
+        db.Index('idx_kit_created_at', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(20), primary_key=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -13,6 +23,10 @@ class Kit(db.Model):
     distributor_id = db.Column(db.String(20), db.ForeignKey('distributor.id'), nullable=True)
     distributor_name = db.Column(db.String(255), nullable=True)
     dispense_date = db.Column(db.DateTime)
+    # optimistic-lock counter; UPDATEs match on it and bump it (see concurrency.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     # The relationship between components and kits
     phone = db.relationship('Phone', backref='kit', uselist=False)
@@ -25,7 +39,7 @@ class Kit(db.Model):
     @validates('distributor_id')
     def validate_distributor_id(self, key, value):
         """When distributor_id is set, automatically update distributor_name."""
-        distributor = Distributor.query.get(value)
+        distributor = Distributor.cached(value) if value else None
         if distributor:
             self.distributor_name = distributor.name
         else:
@@ -47,6 +61,21 @@ class Distributor(db.Model):
 
     kits = db.relationship('Kit', backref='distributor', lazy=True)
 
+    @staticmethod
+    def cached(distributor_id):
+        """
+        Look up (id, name, status) of a distributor through the in-process cache.
+        Returns None if the distributor does not exist.
+        """
+        return distributor_cache.get(distributor_id, _load_distributor)
+
+
+def _load_distributor(distributor_id):
+    return db.session.execute(
+        db.select(Distributor.id, Distributor.name, Distributor.status)
+        .where(Distributor.id == distributor_id)
+    ).first()
+
 class ComponentUsage(db.Model):
     __tablename__ = 'component_usage'
 
@@ -84,16 +113,26 @@ class BaseComponent(db.Model):
     status = db.Column(db.String(50), default='available')  # available, in-kit, refurbishing, scrapped
     discarded_at = db.Column(db.DateTime)
     kit_id = db.Column(db.String(20), db.ForeignKey('kit.id'))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    @declared_attr
+    def __mapper_args__(cls):
+        # each component table gets its own copy of the column
+        return {'version_id_col': cls.__table__.c.version}
 
     @staticmethod
-    def change_state(component_id, status):
+    def change_state(component_id, status, expected_version=None):
         """
         Args:
             component_id:
             status: ('available', 'in-kit', 'refurbishing', 'scrapped')
+            expected_version: version the caller last saw, if any
 
         Returns:
             tuple: (component_id, status)
+
+        Raises:
+            VersionConflict / StaleDataError: the component changed since it was read
         """
         try:
 
@@ -109,6 +148,7 @@ class BaseComponent(db.Model):
 
             if not component:
                 return None, None, f"Component with id {component_id} not found"
+            expect_version(component, expected_version)
 
             if component.status == 'in-kit' and status == 'scrapped':
                 return None, None, "Cannot scrap a component currently 'in-kit'"
@@ -123,10 +163,14 @@ class BaseComponent(db.Model):
             component.status = status
             if status == 'scrapped':
                 component.discarded_at = datetime.utcnow()
+            emit('component.status_changed', id=component.id, type=component.__tablename__, status=status)
 
             db.session.commit()
             return component, component_type, None
 
+        except CONFLICT_ERRORS:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             return None, None, str(e)
@@ -147,4 +191,63 @@ class LeftSensor(BaseComponent):
 class Headphone(BaseComponent):
     __tablename__ = 'headphone'
 class Box(BaseComponent):
-    __tablename__ = 'box'
\ No newline at end of file
+    __tablename__ = 'box'
+
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the same transaction as every write (see versioning.py)"""
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class InventoryCounter(db.Model):
+    """Kits and components per (kind, scope, status), kept current by every write (see counters.py)"""
+    __tablename__ = 'inventory_counter'
+
+    kind = db.Column(db.String(32), primary_key=True)  # 'kit' or a component table name
+    scope = db.Column(db.String(20), primary_key=True, default='')  # kit distributor_id, else ''
+    status = db.Column(db.String(50), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class KitSequence(db.Model):
+    """Last kit serial handed out per day; shared by every worker process"""
+    __tablename__ = 'kit_sequence'
+
+    day = db.Column(db.Date, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def next_value(connection, day):
+        """
+        Increment and return the serial for ``day`` inside the caller's transaction.
+        The incremented row stays locked until commit, so concurrent workers never share a serial.
+        """
+        table = KitSequence.__table__
+        dialect_name = connection.dialect.name
+        if dialect_name == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(table).on_duplicate_key_update(last_value=table.c.last_value + 1)
+        elif dialect_name in ('sqlite', 'postgresql'):
+            if dialect_name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(table).on_conflict_do_update(
+                index_elements=['day'], set_={'last_value': table.c.last_value + 1}
+            )
+        else:
+            stmt = None
+
+        if stmt is not None:
+            connection.execute(stmt, {'day': day, 'last_value': 1})
+        else:
+            result = connection.execute(
+                db.update(table).where(table.c.day == day).values(last_value=table.c.last_value + 1)
+            )
+            if not result.rowcount:
+                connection.execute(db.insert(table).values(day=day, last_value=1))
+
+        return connection.execute(db.select(table.c.last_value).where(table.c.day == day)).scalar_one()
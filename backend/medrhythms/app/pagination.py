@@ -0,0 +1,46 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor holds the sort-key values of the last row of a page. The next page
+continues strictly after those values, so deep pages cost the same as the
+first and rows inserted meanwhile never shift the window.
+"""
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token, *parsers):
+    """
+    Inverse of ``encode_cursor``; raises ValueError for anything it did not produce.
+    With ``parsers`` the cursor must hold exactly that many values, and each
+    is converted by its parser (e.g. ``datetime.fromisoformat``).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or (parsers and len(values) != len(parsers)):
+            raise ValueError
+        if parsers:
+            values = [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def after(columns, values, descending=False):
+    """
+    WHERE clause for rows after ``values`` in (columns...) order.
+    Spelled out as OR/AND rather than a row-value comparison so MySQL uses the index range.
+    """
+    clauses = []
+    for index, column in enumerate(columns):
+        beyond = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*[columns[i] == values[i] for i in range(index)], beyond))
+    return or_(*clauses)
@@ -0,0 +1,102 @@
+"""
+Opt-in per-request profiling.
+
+With ``PROFILING_ENABLED`` set, an ``/api`` request carrying the
+``X-Profile: 1`` header runs under cProfile. The raw ``.pstats`` file and a
+top-N text summary are written to ``LOG_DIR/profiles``. At most
+``PROFILE_MAX_PER_MINUTE`` requests per worker are profiled, and only one
+at a time, so profiling cannot itself overload the server.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, request
+
+
+class RateLimiter:
+    """Sliding one-minute window of allowed events."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._events and now - self._events[0] > 60:
+                self._events.popleft()
+            if len(self._events) >= self.per_minute:
+                return False
+            self._events.append(now)
+            return True
+
+
+class RequestProfiler:
+    def __init__(self, app):
+        self.header = app.config['PROFILE_HEADER']
+        self.top_n = app.config['PROFILE_TOP_N']
+        self.directory = app.config['PROFILE_DIR'] or os.path.join(app.config['LOG_DIR'], 'profiles')
+        self.limiter = RateLimiter(app.config['PROFILE_MAX_PER_MINUTE'])
+        # cProfile cannot run two profilers at once, so requests are profiled one at a time
+        self._active = threading.Lock()
+
+    def start(self):
+        if request.blueprint != 'api' or request.headers.get(self.header) != '1':
+            return
+        if not self.limiter.allow():
+            current_app.logger.info('Profile request for %s skipped: rate limit reached', request.path)
+            return
+        if not self._active.acquire(blocking=False):
+            return
+
+        g.profiler = cProfile.Profile()
+        g.profiled_request = request._get_current_object()
+        g.profiler.enable()
+
+    def stop(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        self._active.release()
+
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{request.endpoint or 'unknown'}"
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f'{name}.pstats'))
+
+        summary = io.StringIO()
+        summary.write(f'{request.method} {request.full_path} -> {response.status_code}\n\n')
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top_n)
+        with open(os.path.join(self.directory, f'{name}.txt'), 'w') as f:
+            f.write(summary.getvalue())
+
+        response.headers['X-Profile-Id'] = name
+        return response
+
+    def teardown(self, exc):
+        # /api/batch sub-requests share g; only the request that started the profiler stops it
+        if g.get('profiled_request') is not request._get_current_object():
+            return
+        # the view raised before after_request ran: stop profiling without writing a report
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._active.release()
+
+
+def init_app(app):
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    profiler = RequestProfiler(app)
+    app.before_request(profiler.start)
+    app.after_request(profiler.stop)
+    app.teardown_request(profiler.teardown)
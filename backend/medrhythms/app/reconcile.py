@@ -0,0 +1,189 @@
+"""
+Set-based consistency checks between kits, components and usage records.
+
+Each ``Check`` is a condition over one table, written as an anti-join or
+semi-join (``NOT EXISTS`` / ``NOT IN`` against a primary key or a single
+subquery), so it runs as one pass over that table however large it is.
+``report`` counts every check of a table in a single scan
+(``SUM(CASE WHEN ... )``) and samples a few ids of the ones that fail.
+
+``repair`` fixes the checks that have an unambiguous fix, in batches of
+``batch_size`` ids per transaction so locks stay short. Each batch
+re-applies the condition, bumps the row ``version`` and the table's
+``table_version`` counter, emits a ``reconcile.repaired`` change-feed
+event with the batch's ids, and commits. Afterwards the inventory counters
+are rebuilt, since bulk UPDATEs bypass the ORM hooks that maintain them.
+Checks without a safe fix are report-only.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, exists, func, select, update, and_, or_
+
+from . import counters
+from .events import emit
+from .models import Kit, ComponentUsage
+from .versioning import bump_versions
+
+SCRAPPED_KIT = 'Scarped'  # sic: the status disassembly writes
+
+
+def _kit_exists(*criteria):
+    return exists().where(*criteria)
+
+
+def _release_from_kit(model):
+    # a component leaving a kit goes to refurbishing, unless it already left service
+    return {
+        'kit_id': None,
+        'status': case((model.status == 'in-kit', 'refurbishing'), else_=model.status),
+    }
+
+
+def _close_usage():
+    return {'end_time': datetime.utcnow()}
+
+
+class Check:
+    """Rows of ``model`` matching ``condition`` are inconsistent; ``fix`` returns the UPDATE values, if any."""
+
+    def __init__(self, name, description, model, condition, fix=None):
+        self.name = name
+        self.description = description
+        self.model = model
+        self.condition = condition
+        self.fix = fix
+
+    @property
+    def pk(self):
+        return self.model.__table__.primary_key.columns[0]
+
+    def sample(self, session, limit):
+        return session.scalars(select(self.pk).where(self.condition).order_by(self.pk).limit(limit)).all()
+
+    def repair(self, session, batch_size, max_batches=None):
+        """Fix matching rows ``batch_size`` at a time, one transaction each; returns the number fixed."""
+        fixed, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            ids = session.scalars(select(self.pk).where(self.condition).limit(batch_size)).all()
+            if not ids:
+                break
+            values = self.fix(self.model)
+            if 'version' in self.model.__table__.c:
+                values['version'] = self.model.version + 1
+            # the condition again, in case another writer fixed some of these meanwhile
+            result = session.execute(
+                update(self.model).where(self.pk.in_(ids), self.condition).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            bump_versions(session.connection(), [self.model.__tablename__])
+            if result.rowcount:
+                # published by the commit, like the events of the write endpoints
+                emit('reconcile.repaired', check=self.name, type=self.model.__tablename__, ids=list(ids))
+            session.commit()
+            fixed += result.rowcount
+            batches += 1
+        return fixed
+
+
+def _component_checks(model):
+    table = model.__tablename__
+    kit_id = model.kit_id
+    return [
+        Check(
+            f'{table}.missing_kit', f'{table} rows pointing at a kit that does not exist',
+            model, and_(kit_id.is_not(None), ~_kit_exists(Kit.id == kit_id)), _release_from_kit,
+        ),
+        Check(
+            f'{table}.in_scrapped_kit', f'{table} rows still attached to a disassembled kit',
+            model, and_(kit_id.is_not(None), _kit_exists(Kit.id == kit_id, Kit.status == SCRAPPED_KIT)),
+            _release_from_kit,
+        ),
+        Check(
+            f'{table}.in_kit_without_kit', f"{table} rows with status 'in-kit' but no kit",
+            model, and_(model.status == 'in-kit', kit_id.is_(None)),
+            lambda m: {'status': 'refurbishing'},
+        ),
+        Check(
+            f'{table}.kit_without_in_kit', f"{table} rows attached to a live kit but not 'in-kit'",
+            model, and_(kit_id.is_not(None), model.status != 'in-kit',
+                        _kit_exists(Kit.id == kit_id, Kit.status != SCRAPPED_KIT)),
+        ),
+    ]
+
+
+_open_usage = ComponentUsage.end_time.is_(None)
+_open_usage_kit_ids = select(ComponentUsage.kit_id).where(_open_usage, ComponentUsage.kit_id.is_not(None))
+
+CHECKS = [
+    *[check for model in counters.COMPONENT_MODELS for check in _component_checks(model)],
+    Check(
+        'component_usage.open_for_inactive_kit', 'open usage records of kits that are no longer In-use',
+        ComponentUsage,
+        and_(_open_usage, _kit_exists(Kit.id == ComponentUsage.kit_id, Kit.status != 'In-use')),
+        lambda m: _close_usage(),
+    ),
+    Check(
+        'component_usage.open_for_missing_kit', 'open usage records whose kit does not exist',
+        ComponentUsage,
+        and_(_open_usage, or_(ComponentUsage.kit_id.is_(None), ~_kit_exists(Kit.id == ComponentUsage.kit_id))),
+        lambda m: _close_usage(),
+    ),
+    Check(
+        'kit.in_use_without_distributor', 'kits In-use with no distributor',
+        Kit, and_(Kit.status == 'In-use', Kit.distributor_id.is_(None)),
+    ),
+    Check(
+        'kit.in_use_without_open_usage', 'kits In-use with no open usage record',
+        # NOT IN one subquery rather than a correlated NOT EXISTS: usage has no kit_id index to probe
+        Kit, and_(Kit.status == 'In-use', Kit.id.not_in(_open_usage_kit_ids)),
+    ),
+]
+CHECKS_BY_NAME = {check.name: check for check in CHECKS}
+
+
+def select_checks(names=None):
+    """The named checks in their fixed order; raises ValueError on unknown names."""
+    if not names:
+        return list(CHECKS)
+    unknown = [name for name in names if name not in CHECKS_BY_NAME]
+    if unknown:
+        raise ValueError(f"Unknown checks: {', '.join(unknown)}")
+    return [check for check in CHECKS if check.name in names]
+
+
+def report(session, checks=None, sample_size=20):
+    """``[{name, description, count, repairable, sample}]``, one scan per table."""
+    checks = checks or CHECKS
+    counts = {}
+    by_model = {}
+    for check in checks:
+        by_model.setdefault(check.model, []).append(check)
+    for model, model_checks in by_model.items():
+        row = session.execute(
+            select(*[func.coalesce(func.sum(case((check.condition, 1), else_=0)), 0) for check in model_checks])
+            .select_from(model)
+        ).one()
+        counts.update(zip((check.name for check in model_checks), row))
+
+    return [
+        {
+            'name': check.name,
+            'description': check.description,
+            'count': counts[check.name],
+            'repairable': check.fix is not None,
+            'sample': check.sample(session, sample_size) if counts[check.name] else [],
+        }
+        for check in checks
+    ]
+
+
+def repair(session, checks=None, batch_size=1000, max_batches=None):
+    """Fix every repairable check, then rebuild the inventory counters; returns ``{name: rows fixed}``."""
+    fixed = {}
+    for check in checks or CHECKS:
+        if check.fix is not None:
+            fixed[check.name] = check.repair(session, batch_size, max_batches)
+    if any(fixed.values()):
+        counters.rebuild(session)
+        session.commit()
+    return fixed
@@ -0,0 +1,203 @@
+"""
+Optional read replicas.
+
+Every URI in ``REPLICA_DATABASE_URIS`` becomes a bind named ``replica_<n>``.
+GET and HEAD requests to the api blueprint read from one of them, chosen
+round-robin. Writes, flushes, ``SELECT ... FOR UPDATE`` and everything
+outside those requests stay on the primary.
+
+Read-your-writes: a successful write sets a cookie that keeps that client's
+reads on the primary for ``REPLICA_READ_YOUR_WRITES_SECONDS``. Clients that
+do not send cookies (e.g. cross-origin) can send ``X-Read-Primary: 1``.
+
+Lag safety: with ``REPLICA_MAX_LAG_SECONDS`` set, each replica's
+``table_version`` counters are compared with the primary's at most every
+``REPLICA_LAG_CHECK_SECONDS``. A replica that is further behind than the
+limit, or unreachable, is skipped until it catches up.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import select
+
+BIND_PREFIX = 'replica_'
+PRIMARY_COOKIE = 'read_primary_until'
+PRIMARY_HEADER = 'X-Read-Primary'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def replica_binds(uris, configured_options=None):
+    """SQLALCHEMY_BINDS entries for the replica URIs, with the same engine options as the primary."""
+    from .config import engine_options
+
+    return {
+        f'{BIND_PREFIX}{index}': dict(engine_options(uri, configured_options), url=uri)
+        for index, uri in enumerate(uris)
+    }
+
+
+def _is_plain_select(clause):
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the replica chosen for the current request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_plain_select(clause) and has_app_context():
+            replica = g.get('db_replica')
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaState:
+    def __init__(self):
+        self.healthy = True
+        self.lag_seconds = None
+        self.checked_at = None
+        self.error = None
+
+    def snapshot(self):
+        return {
+            'healthy': self.healthy,
+            'lag_seconds': None if self.lag_seconds is None else round(self.lag_seconds, 1),
+            'checked_ago_seconds': None if self.checked_at is None else round(time.monotonic() - self.checked_at, 1),
+            'error': self.error,
+        }
+
+
+def _read_versions(engine):
+    from .models import TableVersion
+
+    with engine.connect() as connection:
+        return dict(connection.execute(select(TableVersion.table_name, TableVersion.version)).all())
+
+
+class ReplicaRouter:
+    """Round-robin choice among the replicas that are not lagging."""
+
+    def __init__(self, bind_keys, max_lag=None, check_interval=5):
+        self.bind_keys = list(bind_keys)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.states = {key: ReplicaState() for key in self.bind_keys}
+        self._cycle = itertools.cycle(self.bind_keys)
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._last_check = None
+        # (monotonic time, primary versions) taken at each check
+        self._primary_snapshots = deque()
+
+    def choose(self):
+        """Bind key of the next healthy replica, or None to read from the primary."""
+        if self.max_lag is not None:
+            self._maybe_check()
+        with self._lock:
+            for _ in self.bind_keys:
+                key = next(self._cycle)
+                if self.states[key].healthy:
+                    return key
+        return None
+
+    def _maybe_check(self):
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < self.check_interval:
+            return
+        # one thread checks; the others keep using the last verdict
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            self.check(now)
+        finally:
+            self._check_lock.release()
+
+    def check(self, now=None):
+        """
+        Estimate every replica's lag from the primary's version counters.
+
+        A replica holding every version of a primary snapshot taken at time T
+        is at most ``now - T`` behind, so the lag is known to within
+        ``check_interval``.
+        """
+        from . import db
+
+        now = now or time.monotonic()
+        self._primary_snapshots.append((now, _read_versions(db.engines[None])))
+        # once the second-oldest snapshot is past the limit, the oldest can't change a verdict
+        while len(self._primary_snapshots) > 1 and now - self._primary_snapshots[1][0] > self.max_lag:
+            self._primary_snapshots.popleft()
+
+        for key, state in self.states.items():
+            state.checked_at = now
+            try:
+                versions = _read_versions(db.engines[key])
+            except Exception as e:
+                state.healthy, state.lag_seconds, state.error = False, None, str(e)
+                current_app.logger.warning('Replica %s unavailable: %s', key, e)
+                continue
+
+            reached = next(
+                (taken_at for taken_at, primary in reversed(self._primary_snapshots)
+                 if all(versions.get(table, 0) >= version for table, version in primary.items())),
+                None
+            )
+            state.lag_seconds = now - (reached if reached is not None else self._primary_snapshots[0][0])
+            state.error = None
+            healthy = state.lag_seconds <= self.max_lag
+            if state.healthy and not healthy:
+                current_app.logger.warning('Replica %s is %.1fs behind; reading from the primary', key, state.lag_seconds)
+            state.healthy = healthy
+
+    def snapshot(self):
+        return {key: state.snapshot() for key, state in self.states.items()}
+
+
+def _recently_wrote():
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def route_reads():
+    """Send this request's plain SELECTs to a replica, unless the client must read its own writes."""
+    router = current_app.extensions.get('replicas')
+    if router is None or request.headers.get(PRIMARY_HEADER) == '1' or _recently_wrote():
+        return
+    g.db_replica = router.choose()
+
+
+def _route_request():
+    if request.blueprint == 'api' and request.method in READ_METHODS:
+        route_reads()
+
+
+def _remember_write(response):
+    window = current_app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+    # g.reads_only: a POST that only reads, such as a batch of GETs
+    if (window and request.blueprint == 'api' and request.method not in (*READ_METHODS, 'OPTIONS')
+            and not g.get('reads_only') and response.status_code < 400):
+        response.set_cookie(PRIMARY_COOKIE, str(int(time.time() + window)), max_age=window,
+                            httponly=True, samesite='Lax')
+    return response
+
+
+def init_app(app):
+    """Route api reads to the replica binds, if any are configured."""
+    bind_keys = [key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith(BIND_PREFIX)]
+    if not bind_keys:
+        return
+
+    app.extensions['replicas'] = ReplicaRouter(
+        bind_keys,
+        max_lag=app.config['REPLICA_MAX_LAG_SECONDS'],
+        check_interval=app.config['REPLICA_LAG_CHECK_SECONDS'],
+    )
+    app.before_request(_route_request)
+    app.after_request(_remember_write)
@@ -1,3 +1,4 @@
+"""Development server with the debugger. Use gunicorn (see wsgi.py) in production."""
 from medrhythms.app import create_app
 
 app = create_app()
@@ -0,0 +1,55 @@
+"""
+Bulk resolution of scanned ids.
+
+A scanned id can be a kit or any of the six component types. Looking each
+one up separately costs up to seven queries per id (``change_state`` probes
+the component tables in turn). ``resolve`` instead asks all seven tables
+at once: one ``UNION ALL`` per ``CHUNK_SIZE`` ids, each branch an
+``id IN (...)`` primary-key lookup. Component branches LEFT JOIN their kit
+for its distributor. A pallet of a few hundred ids therefore takes one
+query, whatever mix of types it contains.
+"""
+from sqlalchemy import literal, null, select, union_all, String
+
+from .counters import COMPONENT_MODELS
+from .models import Kit
+
+# ids per UNION ALL; each id is bound once per table, so 7 x CHUNK_SIZE parameters
+CHUNK_SIZE = 500
+
+TYPES = (Kit.__tablename__, *(model.__tablename__ for model in COMPONENT_MODELS))
+_TYPE_ORDER = {name: index for index, name in enumerate(TYPES)}
+
+
+def _kit_branch(ids):
+    return select(
+        Kit.id, literal(Kit.__tablename__, String).label('type'), Kit.status,
+        null().label('kit_id'), Kit.distributor_id, Kit.version,
+    ).where(Kit.id.in_(ids))
+
+
+def _component_branch(model, ids):
+    return (
+        select(
+            model.id, literal(model.__tablename__, String).label('type'), model.status,
+            model.kit_id, Kit.distributor_id, model.version,
+        )
+        .select_from(model)
+        .outerjoin(Kit, Kit.id == model.kit_id)
+        .where(model.id.in_(ids))
+    )
+
+
+def resolve(session, ids):
+    """``{id: {id, type, status, kit_id, distributor_id, version}}`` for the ids that exist."""
+    ids = list(dict.fromkeys(ids))
+    found = {}
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        stmt = union_all(_kit_branch(chunk), *(_component_branch(model, chunk) for model in COMPONENT_MODELS))
+        for row in session.execute(stmt):
+            # ids are unique per table, not across tables; the earlier type in TYPES wins
+            existing = found.get(row.id)
+            if existing is None or _TYPE_ORDER[row.type] < _TYPE_ORDER[existing['type']]:
+                found[row.id] = dict(row._mapping)
+    return found
@@ -0,0 +1,169 @@
+"""
+Schema-driven serializers for the list endpoints.
+
+Each model has one ``Serializer`` describing its JSON shape: output names
+mapped to columns, plus constant fields. A request's ``?fields=`` list
+narrows both the SELECT (only the needed columns are projected, no ORM
+objects are built) and the output. ``compile`` turns the chosen fields
+into a plain row -> dict function.
+"""
+from flask import request
+from sqlalchemy import select
+
+from .models import (
+    Kit, Distributor, ComponentUsage,
+    Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+)
+
+
+class Serializer:
+    def __init__(self, model, columns, constants=None, defaults=None):
+        """
+        Args:
+            model: the mapped class
+            columns: dict of output name -> column attribute
+            constants: dict of output name -> fixed value
+            defaults: output names returned when no fields are requested
+                (all columns and constants if omitted)
+        """
+        self.model = model
+        self.columns = dict(columns)
+        self.constants = dict(constants or {})
+        self.defaults = list(defaults or [*self.columns, *self.constants])
+
+    @property
+    def available(self):
+        return [*self.columns, *self.constants]
+
+    def parse_fields(self, value):
+        """Turn a ``fields`` query value into a list of output names."""
+        if not value:
+            return self.defaults
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.columns and name not in self.constants]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return names
+
+    def select(self, names):
+        """SELECT projecting only the columns behind ``names``."""
+        columns = [self.columns[name] for name in names if name in self.columns]
+        if not columns:
+            # constant-only requests still need one row per record
+            columns = [self.model.__mapper__.primary_key[0]]
+        return select(*columns)
+
+    def compile(self, names):
+        """Return a function mapping a row from ``select(names)`` to a dict."""
+        column_names = [name for name in names if name in self.columns]
+        constants = {name: self.constants[name] for name in names if name in self.constants}
+
+        if not column_names:
+            return lambda row: dict(constants)
+        if not constants:
+            return lambda row: dict(zip(column_names, row))
+
+        def to_dict(row):
+            data = dict(zip(column_names, row))
+            data.update(constants)
+            return data
+        return to_dict
+
+    def dump(self, session, names, *criteria, order_by=None):
+        """Run the narrowed SELECT with optional WHERE criteria and serialize every row."""
+        stmt = self.select(names)
+        if criteria:
+            stmt = stmt.where(*criteria)
+        if order_by is not None:
+            stmt = stmt.order_by(order_by)
+        to_dict = self.compile(names)
+        return [to_dict(row) for row in session.execute(stmt)]
+
+
+def requested_fields(serializer):
+    """Output names for the current request's ``?fields=`` (raises ValueError on unknown names)."""
+    return serializer.parse_fields(request.args.get('fields'))
+
+
+kit_serializer = Serializer(
+    Kit,
+    columns={
+        'id': Kit.id,
+        'created_at': Kit.created_at,
+        'updated_at': Kit.updated_at,
+        'status': Kit.status,
+        # distributor_name is kept in sync with distributor_id, so no join is needed
+        'distributor': Kit.distributor_name,
+        'distributor_id': Kit.distributor_id,
+        'dispense_date': Kit.dispense_date,
+        'version': Kit.version,
+    },
+    constants={'batch_number': 0},
+    defaults=['id', 'created_at', 'status', 'batch_number', 'distributor', 'dispense_date', 'version'],
+)
+
+distributor_serializer = Serializer(
+    Distributor,
+    columns={
+        'id': Distributor.id,
+        'name': Distributor.name,
+        'email': Distributor.email,
+        'tel': Distributor.tel,
+        'address': Distributor.address,
+        'city': Distributor.city,
+        'contactPerson': Distributor.contact_person,
+        'status': Distributor.status,
+        'createdAt': Distributor.created_at,
+    },
+)
+
+usage_serializer = Serializer(
+    ComponentUsage,
+    columns={
+        'id': ComponentUsage.id,
+        'component_id': ComponentUsage.component_id,
+        'component_type': ComponentUsage.component_type,
+        'kit_id': ComponentUsage.kit_id,
+        'distributor_id': ComponentUsage.distributor_id,
+        'start_time': ComponentUsage.start_time,
+        'end_time': ComponentUsage.end_time,
+    },
+)
+
+
+def _component_serializer(model, type_name):
+    return Serializer(
+        model,
+        columns={
+            'id': model.id,
+            'batch_number': model.batch_number,
+            'model_number': model.model_number,
+            'status': model.status,
+            'created_at': model.created_at,
+            'discarded_at': model.discarded_at,
+            'kit_id': model.kit_id,
+            'version': model.version,
+        },
+        constants={'type': type_name},
+        defaults=['id', 'batch_number', 'status', 'created_at', 'discarded_at', 'kit_id', 'type', 'version'],
+    )
+
+
+# component serializers in the order the components endpoints list them
+component_serializers = [
+    _component_serializer(Phone, 'Phone'),
+    _component_serializer(SimCard, 'SimCard'),
+    _component_serializer(RightSensor, 'RightSensor'),
+    _component_serializer(LeftSensor, 'LeftSensor'),
+    _component_serializer(Headphone, 'Headphone'),
+    _component_serializer(Box, 'Box'),
+]
+
+SERIALIZERS = {
+    serializer.model: serializer
+    for serializer in [kit_serializer, distributor_serializer, usage_serializer, *component_serializers]
+}
+
+
+def serializer_for(model):
+    return SERIALIZERS[model]
@@ -0,0 +1,101 @@
+"""
+Slow-query log.
+
+Cursor events on every engine time each statement. Statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` are written, one JSON object per line, to
+``LOG_DIR/slow_query.log`` with their parameters, the endpoint that issued
+them and, when ``SLOW_QUERY_EXPLAIN`` is on, the database's plan.
+"""
+import json
+import logging
+import os
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('medrhythms.slow_query')
+
+# longest parameter repr kept in a log entry
+MAX_PARAMS_LENGTH = 1000
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms, explain=False):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+
+    def install(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # per statement, so one that raises leaves nothing behind on the pooled connection
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_start', None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        entry = {
+            'duration_ms': round(elapsed_ms, 3),
+            'statement': statement,
+            'parameters': repr(parameters)[:MAX_PARAMS_LENGTH],
+            'executemany': executemany,
+            'endpoint': None,
+        }
+        if has_request_context():
+            entry['endpoint'] = request.endpoint
+            entry['path'] = f'{request.method} {request.full_path}'
+        if self.explain and not executemany:
+            entry['plan'] = explain(conn, statement, parameters)
+
+        logger.warning(json.dumps(entry, default=str))
+
+
+def explain(conn, statement, parameters):
+    """Run EXPLAIN for a SELECT on the same DBAPI connection, without touching its cursor."""
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [list(row) for row in cursor.fetchall()]
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        cursor.close()
+
+
+def init_app(app):
+    """Attach the slow-query log to every engine when a threshold is configured."""
+    from . import db
+
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold_ms is None:
+        return
+
+    if app.config['LOG_TO_FILE']:
+        from .logging_setup import queued_file_handler, attach
+
+        attach(logger, queued_file_handler(
+            os.path.join(app.config['LOG_DIR'], 'slow_query.log'),
+            logging.Formatter('%(asctime)s %(message)s'),
+            level=logging.WARNING,
+            max_bytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+            backup_count=5
+        ))
+        logger.propagate = False
+    logger.setLevel(logging.WARNING)
+
+    slow_query_log = SlowQueryLog(threshold_ms, app.config.get('SLOW_QUERY_EXPLAIN', False))
+    with app.app_context():
+        for engine in db.engines.values():
+            slow_query_log.install(engine)
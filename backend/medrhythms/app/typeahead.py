@@ -0,0 +1,247 @@
+"""
+In-memory typeahead over kit, component and distributor ids.
+
+Every (type, status) pair keeps one sorted array of case-folded ids, with
+the original ids alongside. A prefix query bisects into each array the
+type and status filters select and merges the matching runs with
+``heapq.merge``. A lookup therefore reads at most ``limit`` entries per
+array, however large the inventory is, and a status filter costs no more
+than an unfiltered query.
+
+Each app gets its own index in ``app.extensions['typeahead']``. It is built
+on first use, once: concurrent first queries wait for that load instead of
+each scanning the tables. ORM writes in this process are collected
+in ``after_flush`` and applied on commit (dropped on rollback). Writes made
+elsewhere, by other workers or bulk imports, are picked up by a background
+rebuild. That rebuild starts once ``table_version`` moved further than this
+process's own applied commits explain, which is checked at most every
+``TYPEAHEAD_REFRESH_SECONDS``; local writes alone never trigger one.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import event, select
+
+from . import db
+from .models import Kit, Distributor, Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+from .versioning import current_versions
+
+# type names as used by the component endpoints and usage records
+INDEXED_MODELS = {
+    Kit: 'kit',
+    Distributor: 'distributor',
+    Phone: 'phone',
+    SimCard: 'sim_card',
+    RightSensor: 'right_sensor',
+    LeftSensor: 'left_sensor',
+    Headphone: 'headphone',
+    Box: 'box',
+}
+TYPES = list(INDEXED_MODELS.values())
+INDEXED_TABLES = tuple(model.__tablename__ for model in INDEXED_MODELS)
+
+_DELETED = object()
+
+
+def _fold(value):
+    folded = value.casefold()
+    # share the string when folding changes nothing, which is the usual case for serials
+    return value if folded == value else folded
+
+
+class _SortedIds:
+    """Sorted folded ids sharing one type and status, with the original ids alongside."""
+
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self, ids=()):
+        entries = sorted((_fold(id_), id_) for id_ in ids)
+        self.keys = [entry[0] for entry in entries]
+        self.ids = [entry[1] for entry in entries]
+
+    def _find(self, key, id_):
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.ids[position] == id_:
+                return position, True
+            position += 1
+        return position, False
+
+    def add(self, id_):
+        key = _fold(id_)
+        position, found = self._find(key, id_)
+        if not found:
+            self.keys.insert(position, key)
+            self.ids.insert(position, id_)
+
+    def remove(self, id_):
+        position, found = self._find(_fold(id_), id_)
+        if found:
+            del self.keys[position], self.ids[position]
+
+    def matches(self, prefix, type_name, status):
+        """(key, id, type, status) for every id starting with ``prefix``, in order."""
+        keys, ids = self.keys, self.ids
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield keys[position], ids[position], type_name, status
+            position += 1
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class TypeaheadIndex:
+    """Prefix index keyed by (type, status), so type and status filters only pick arrays."""
+
+    def __init__(self, refresh_seconds=30):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        # held for the first load only, so cold requests queue behind one scan
+        self._build_lock = threading.Lock()
+        self._columns = None
+        self._versions = None
+        # table_version bumps of commits already applied since _versions was read
+        self._local_bumps = Counter()
+        self._checked_at = None
+        self._rebuilding = False
+
+    def search(self, prefix, limit=10, types=None, status=None):
+        """Up to ``limit`` entries whose id starts with ``prefix`` (case-insensitive), sorted by id."""
+        self._ensure_fresh()
+        prefix = prefix.casefold()
+        status = status.casefold() if status else None
+        with self._lock:
+            runs = [
+                column.matches(prefix, type_name, column_status)
+                for (type_name, column_status), column in self._columns.items()
+                if (not types or type_name in types)
+                and (status is None or (column_status or '').casefold() == status)
+            ]
+            return [
+                {'id': id_, 'type': type_name, 'status': entry_status}
+                for _, id_, type_name, entry_status in islice(heapq.merge(*runs), limit)
+            ]
+
+    def rebuild(self):
+        """Reload every id and status (needs an app context)."""
+        # versions first, so a write racing the load is seen as a change next time
+        versions = current_versions(INDEXED_TABLES)
+        groups = {}
+        for model, type_name in INDEXED_MODELS.items():
+            for id_, status in db.session.execute(select(model.id, model.status)):
+                groups.setdefault((type_name, status), []).append(id_)
+        columns = {key: _SortedIds(ids) for key, ids in groups.items()}
+
+        with self._lock:
+            self._columns = columns
+            self._versions = versions
+            # commits during the load may be missing from it; leaving them uncounted makes the next check reload
+            self._local_bumps = Counter()
+            self._checked_at = time.monotonic()
+
+    def apply(self, changes):
+        """Apply committed ``(type, id, status)`` changes from this process."""
+        with self._lock:
+            if self._columns is None:
+                return
+            for type_name, id_, status in changes:
+                for (column_type, column_status), column in self._columns.items():
+                    if column_type == type_name and column_status != status:
+                        column.remove(id_)
+                if status is not _DELETED:
+                    self._columns.setdefault((type_name, status), _SortedIds()).add(id_)
+            # versioning bumps each changed table once per commit (type names are table names)
+            self._local_bumps.update({type_name for type_name, _, _ in changes})
+
+    def stats(self):
+        with self._lock:
+            if self._columns is None:
+                return {'built': False}
+            entries = {}
+            for (type_name, _), column in self._columns.items():
+                entries[type_name] = entries.get(type_name, 0) + len(column)
+            return {
+                'built': True,
+                'entries': entries,
+                'checked_ago_seconds': round(time.monotonic() - self._checked_at, 1),
+                'rebuilding': self._rebuilding,
+            }
+
+    def _ensure_fresh(self):
+        if self._columns is None:
+            with self._build_lock:
+                if self._columns is None:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+
+        self._checked_at = time.monotonic()
+        versions = current_versions(INDEXED_TABLES)
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            local_bumps, self._local_bumps = self._local_bumps, Counter()
+        if any(versions[table] - previous[table] > local_bumps[table] for table in INDEXED_TABLES):
+            self._rebuild_in_background()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception:
+                app.logger.exception('Typeahead index rebuild failed')
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name='typeahead-rebuild', daemon=True).start()
+
+
+def current_index():
+    """The current app's index."""
+    return current_app.extensions['typeahead']
+
+
+def _after_flush(session, flush_context):
+    changes = []
+    for obj in session.new | session.dirty:
+        type_name = INDEXED_MODELS.get(type(obj))
+        if type_name:
+            changes.append((type_name, obj.id, obj.status))
+    for obj in session.deleted:
+        type_name = INDEXED_MODELS.get(type(obj))
+        if type_name:
+            changes.append((type_name, obj.id, _DELETED))
+    if changes:
+        session.info.setdefault('typeahead_changes', []).extend(changes)
+
+
+def _after_commit(session):
+    changes = session.info.pop('typeahead_changes', None)
+    index = current_app.extensions.get('typeahead') if changes else None
+    if index is not None:
+        index.apply(changes)
+
+
+def _after_rollback(session):
+    session.info.pop('typeahead_changes', None)
+
+
+def init_app(app):
+    app.extensions['typeahead'] = TypeaheadIndex(app.config['TYPEAHEAD_REFRESH_SECONDS'])
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
@@ -0,0 +1,137 @@
+"""
+Per-table change counters and conditional GET support.
+
+Every ORM transaction that touches a tracked table bumps that table's row
+in ``table_version`` once, just before it commits, on the same connection,
+so the counter commits or rolls back with the write itself. Bumping once
+per commit rather than per flush keeps the shared counter row locked only
+for the end of the transaction. Bulk writes that bypass the ORM (the import
+engine) call ``bump_versions`` directly.
+
+List endpoints wrapped in ``@conditional(...)`` derive a weak ETag from the
+counters of the tables they read. An unchanged poll is answered with
+``304 Not Modified`` after a single version lookup.
+"""
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+from sqlalchemy import event, select, update, insert
+
+from . import db
+from .models import (
+    TableVersion, Kit, Distributor, ComponentUsage,
+    Phone, SimCard, RightSensor, LeftSensor, Headphone, Box
+)
+
+TRACKED_TABLES = frozenset(
+    model.__tablename__ for model in
+    (Kit, Distributor, ComponentUsage, Phone, SimCard, RightSensor, LeftSensor, Headphone, Box)
+)
+
+COMPONENT_TABLES = tuple(
+    model.__tablename__ for model in (Phone, SimCard, RightSensor, LeftSensor, Headphone, Box)
+)
+
+
+def _bump_statement(dialect_name):
+    """INSERT version 1, or add 1 to an existing counter, in one atomic statement."""
+    table = TableVersion.__table__
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert(table).on_duplicate_key_update(version=table.c.version + 1)
+    if dialect_name in ('sqlite', 'postgresql'):
+        if dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(table).on_conflict_do_update(
+            index_elements=['table_name'], set_={'version': table.c.version + 1}
+        )
+    return None
+
+
+def bump_versions(connection, table_names):
+    """Increment the change counters of ``table_names`` on ``connection``."""
+    table_names = sorted(set(table_names) & TRACKED_TABLES)
+    if not table_names:
+        return
+
+    stmt = _bump_statement(connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt, [{'table_name': name, 'version': 1} for name in table_names])
+        return
+
+    table = TableVersion.__table__
+    for name in table_names:
+        result = connection.execute(
+            update(table).where(table.c.table_name == name).values(version=table.c.version + 1)
+        )
+        if not result.rowcount:
+            connection.execute(insert(table).values(table_name=name, version=1))
+
+
+def current_versions(table_names):
+    """Return {table_name: version} with one query; unknown tables are at version 0."""
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(table_names))
+    )
+    versions = dict.fromkeys(table_names, 0)
+    versions.update(tuple(row) for row in rows)
+    return versions
+
+
+def _after_flush(session, flush_context):
+    # only remember the tables here; autoflush runs many times per request
+    session.info.setdefault('changed_tables', set()).update(
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, '__table__', None) is not None
+    )
+
+
+def _before_commit(session):
+    # commit flushes after this hook, so flush first to see every change
+    session.flush()
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        bump_versions(session.connection(), changed)
+
+
+def _after_rollback(session):
+    session.info.pop('changed_tables', None)
+
+
+def conditional(*table_names):
+    """
+    Answer GETs with 304 Not Modified while none of ``table_names`` changed.
+    The ETag also covers the query string, so ``?fields=`` variants get their own tags.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # read the versions before the data, so a tag is never newer than its body
+            versions = current_versions(table_names)
+            token = ';'.join(f'{name}={versions[name]}' for name in table_names) + '|' + request.full_path
+            etag = hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
@@ -0,0 +1,23 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c medrhythms/gunicorn.conf.py
+
+``post_fork`` must run in every worker when the app is preloaded (the
+gunicorn config does this): pooled connections and logging threads created
+in the parent are not shared with, or usable from, the forked workers.
+"""
+from . import create_app, db
+
+app = create_app()
+
+
+def post_fork():
+    """Make the preloaded app safe to use in a freshly forked worker."""
+    from .logging_setup import restart_after_fork
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the parent's sockets belong to the parent, just forget them here
+            engine.dispose(close=False)
+    restart_after_fork()
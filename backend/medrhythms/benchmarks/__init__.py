@@ -0,0 +1,12 @@
+"""
+Benchmark suite for the inventory API.
+
+``generator`` fills a database with a deterministic synthetic fleet and
+``runner`` drives every ``/api`` endpoint through the Flask test client,
+reporting latency percentiles, query counts and peak memory per endpoint.
+
+Run from the ``backend`` directory::
+
+    python -m medrhythms.benchmarks --scale 10k
+    python -m medrhythms.benchmarks --scale 10k --compare baseline.json
+"""
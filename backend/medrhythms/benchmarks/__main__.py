@@ -0,0 +1,114 @@
+"""
+Command line entry point: ``python -m medrhythms.benchmarks --help``.
+
+With the default SQLite target the generated fleet is cached under
+``--data-dir`` per scale and seed, and every run works on a fresh copy,
+so write scenarios never change the baseline data. With ``--database-url``
+the fleet is generated once into that database and the write scenarios
+modify it.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from ..app import create_app, db
+from ..app.models import Kit
+from .generator import FleetSpec, generate_fleet, parse_scale
+from .runner import run, compare, format_table
+
+
+def benchmark_app(database_uri):
+    return create_app(dict(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        CREATE_SCHEMA=True,
+        LOG_TO_FILE=False,
+        LOG_LEVEL='ERROR',
+        # whole-table reads are expected here; don't flood stderr with them
+        SLOW_QUERY_THRESHOLD_MS=None,
+    ))
+
+
+def ensure_fleet(database_uri, spec, regenerate=False):
+    """Generate ``spec`` into ``database_uri`` unless it already holds a fleet."""
+    app = benchmark_app(database_uri)
+    with app.app_context():
+        if regenerate:
+            db.drop_all()
+            db.create_all()
+        elif db.session.scalar(select(func.count()).select_from(Kit)):
+            db.engine.dispose()
+            return
+
+        print(f'generating {spec.rows:,} rows ({spec.kits:,} kits) ...')
+        started = time.perf_counter()
+        counts = generate_fleet(spec, progress=lambda table, rows: print(f'  {table}: {rows:,}', end='\r'))
+        print(f'\ngenerated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s')
+        db.session.remove()
+        # release the file before it is copied for the run
+        db.engine.dispose()
+
+
+def sqlite_uri(path):
+    return 'sqlite:///' + os.path.abspath(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m medrhythms.benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='approximate number of generated rows, e.g. 10k, 100k, 1m')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='benchmark against this database instead of a cached SQLite file')
+    parser.add_argument('--data-dir', default='benchmark-data', help='where generated SQLite fleets are cached')
+    parser.add_argument('--regenerate', action='store_true', help='rebuild the fleet even if one exists')
+    parser.add_argument('--repeat', type=int, default=20, help='timed requests per scenario')
+    parser.add_argument('--read-only', action='store_true', help='skip the write scenarios')
+    parser.add_argument('--only', nargs='+', metavar='PREFIX', help='run only scenarios whose name starts with PREFIX')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--compare', metavar='BASELINE', help='results JSON of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown as a fraction (default 0.2)')
+    args = parser.parse_args(argv)
+
+    spec = FleetSpec(parse_scale(args.scale), seed=args.seed)
+
+    if args.database_url:
+        database_uri = args.database_url
+        ensure_fleet(database_uri, spec, args.regenerate)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        fleet_path = os.path.join(args.data_dir, f'fleet-{spec.rows}-{spec.seed}.db')
+        ensure_fleet(sqlite_uri(fleet_path), spec, args.regenerate)
+        run_path = os.path.join(args.data_dir, 'run.db')
+        shutil.copyfile(fleet_path, run_path)
+        database_uri = sqlite_uri(run_path)
+
+    print(f'running scenarios against {database_uri.split("://")[0]} ...')
+    document = run(benchmark_app(database_uri), spec, repeat=args.repeat, writes=not args.read_only, only=args.only)
+    print(format_table(document))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f'results written to {args.output}')
+
+    if document['failed']:
+        print('error responses in', ', '.join(document['failed']))
+        return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(document, json.load(f), threshold=args.threshold)
+        if regressions:
+            print('regressions against', args.compare)
+            for line in regressions:
+                print('  ' + line)
+            return 1
+        print('no regressions against', args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Deterministic synthetic fleet generator.
+
+A fleet of roughly ``rows`` rows is made of distributors, kits with their
+six components, spare components and multi-cycle ``ComponentUsage``
+history. Every value derives from ``seed`` (per-kit RNGs are re-seeded from
+the kit's index), so the same scale always produces the same database and
+nothing but the current chunk is held in memory. Rows are written through
+the import engine, so they take the bulk upsert path in FK order.
+"""
+import random
+from datetime import datetime, timedelta
+
+from ..app.importer import ImportEngine
+
+# component table -> (usage component_type, id prefix)
+COMPONENT_TYPES = [
+    ('phones', 'phone', 'PH'),
+    ('sim_cards', 'sim_card', 'SIM'),
+    ('right_sensors', 'right_sensor', 'RS'),
+    ('left_sensors', 'left_sensor', 'LS'),
+    ('headphones', 'headphone', 'HP'),
+    ('boxes', 'box', 'BX'),
+]
+
+# approximate rows per kit: 1 kit + 6 components + 20% spares + ~12 usages
+ROWS_PER_KIT = 20
+SPARE_RATIO = 0.2
+EPOCH = datetime(2024, 1, 1)
+
+
+def parse_scale(value):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500"""
+    value = str(value).strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    if multiplier != 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+class FleetSpec:
+    def __init__(self, rows, seed=42):
+        self.rows = rows
+        self.seed = seed
+        self.kits = max(10, rows // ROWS_PER_KIT)
+        self.distributors = max(5, rows // 2000)
+        self.spares = int(self.kits * SPARE_RATIO)
+
+    def kit_rng(self, index):
+        return random.Random(self.seed * 1_000_003 + index)
+
+    def kit_id(self, index):
+        return f'MR{index:08d}'
+
+    def distributor_id(self, index):
+        return f'D{index:05d}'
+
+    def component_id(self, prefix, index):
+        return f'{prefix}{index:08d}'
+
+    def kit_plan(self, index):
+        """Lifecycle of kit ``index``: creation time, completed cycles and whether it is out now."""
+        rng = self.kit_rng(index)
+        created_at = EPOCH + timedelta(minutes=rng.randrange(0, 60 * 24 * 600))
+        cycles = rng.choice([0, 1, 1, 2, 2, 3])
+        in_use = cycles > 0 and rng.random() < 0.4
+        distributor = rng.randrange(self.distributors)
+        return rng, created_at, cycles, in_use, distributor
+
+
+def _distributors(spec):
+    rng = random.Random(spec.seed)
+    for index in range(spec.distributors):
+        yield 'distributors', {
+            'id': spec.distributor_id(index),
+            'name': f'Distributor {index}',
+            'email': f'distributor{index}@example.com',
+            'tel': f'555-{index:07d}',
+            'address': f'{rng.randrange(1, 999)} Main St',
+            'city': rng.choice(['Boston', 'Seattle', 'Austin', 'Denver', 'Chicago']),
+            'contact_person': f'Contact {index}',
+            'status': 'active' if rng.random() < 0.9 else 'inactive',
+            'created_at': EPOCH,
+        }
+
+
+def _kits(spec):
+    for index in range(spec.kits):
+        _, created_at, cycles, in_use, distributor = spec.kit_plan(index)
+        status = 'In-use' if in_use else ('Used' if cycles else 'Available')
+        dispense_date = created_at + timedelta(days=30 * cycles) if cycles else None
+        yield 'kits', {
+            'id': spec.kit_id(index),
+            'created_at': created_at,
+            'updated_at': dispense_date,
+            'status': status,
+            'distributor_id': spec.distributor_id(distributor) if in_use else None,
+            'distributor_name': f'Distributor {distributor}' if in_use else None,
+            'dispense_date': dispense_date,
+        }
+
+
+def _components(spec):
+    for table_name, _, prefix in COMPONENT_TYPES:
+        for index in range(spec.kits + spec.spares):
+            in_kit = index < spec.kits
+            rng = random.Random(f'{spec.seed}:{prefix}:{index}')
+            status = 'in-kit' if in_kit else rng.choice(['available', 'available', 'refurbishing', 'scrapped'])
+            created_at = EPOCH + timedelta(minutes=rng.randrange(0, 60 * 24 * 600))
+            yield table_name, {
+                'id': spec.component_id(prefix, index),
+                'created_at': created_at,
+                'batch_number': f'B{index // 500:05d}',
+                'model_number': f'{prefix}-M{rng.randrange(1, 4)}',
+                'status': status,
+                'discarded_at': created_at + timedelta(days=90) if status == 'scrapped' else None,
+                'kit_id': spec.kit_id(index) if in_kit else None,
+            }
+
+
+def _usages(spec):
+    usage_id = 0
+    for index in range(spec.kits):
+        rng, created_at, cycles, in_use, distributor = spec.kit_plan(index)
+        for cycle in range(cycles):
+            start = created_at + timedelta(days=30 * cycle)
+            open_cycle = in_use and cycle == cycles - 1
+            cycle_distributor = distributor if open_cycle else rng.randrange(spec.distributors)
+            for _, component_type, prefix in COMPONENT_TYPES:
+                usage_id += 1
+                yield 'component_usages', {
+                    'id': usage_id,
+                    'component_id': spec.component_id(prefix, index),
+                    'component_type': component_type,
+                    'kit_id': spec.kit_id(index),
+                    'distributor_id': spec.distributor_id(cycle_distributor),
+                    'start_time': start,
+                    'end_time': None if open_cycle else start + timedelta(days=rng.randrange(5, 28)),
+                }
+
+
+def fleet_records(spec):
+    """Every generated ``(table_name, row)`` record in FK order."""
+    yield from _distributors(spec)
+    yield from _kits(spec)
+    yield from _components(spec)
+    yield from _usages(spec)
+
+
+def generate_fleet(spec, chunk_size=5000, progress=None):
+    """Write the fleet through the import engine (needs an app context) and return row counts."""
+    engine = ImportEngine(chunk_size=chunk_size, progress=progress)
+    return engine.load(fleet_records(spec))
@@ -0,0 +1,434 @@
+"""
+Drive the API through the Flask test client and measure every endpoint.
+
+Each ``Scenario`` issues one kind of request ``repeat`` times. The first
+iteration is a warm-up run under ``tracemalloc`` (its peak is the reported
+memory figure); the remaining iterations are timed without tracing. Query
+counts come from the ``X-Query-Count`` header set by the metrics hooks.
+
+Write scenarios run in lifecycle order (create -> distribute -> collect ->
+disassemble) and feed each other through ``Context``, so they exercise the
+same paths real traffic does.
+"""
+import io
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from ..app import db
+from ..app.importer import ImportEngine
+from ..app.metrics import percentile
+from ..app.models import Kit, Distributor, ComponentUsage
+from .generator import COMPONENT_TYPES
+
+# request body keys of /kits/create, in COMPONENT_TYPES order
+KIT_COMPONENT_KEYS = ['phone_ID', 'SIM_card_ID', 'right_sensor_ID', 'left_sensor_ID', 'headphones_ID', 'box_ID']
+
+# slower whole-database endpoints run fewer times
+EXPORT_REPEAT = 3
+
+
+class Scenario:
+    def __init__(self, name, endpoint, build, repeat=None, writes=False):
+        """
+        Args:
+            name: label used in the results
+            endpoint: Flask endpoint the scenario covers (e.g. 'api.get_all_kits')
+            build: function(ctx, iteration) -> dict of test client ``open`` arguments
+            repeat: iterations, overriding the runner default
+            writes: True if the scenario modifies the database
+        """
+        self.name = name
+        self.endpoint = endpoint
+        self.build = build
+        self.repeat = repeat
+        self.writes = writes
+
+
+class Context:
+    """Ids sampled from the generated fleet plus state handed between write scenarios."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.run_id = datetime.now().strftime('%H%M%S')
+        self.kits = []
+        self.distributors = []
+        self.components = []
+        self.batch_number = 'B00000'
+        self.spare_sets = []
+        self.spare_components = []
+        self.created_kits = []
+        self.many_kits = []
+        self.distributed = []
+        self.collected = []
+
+    def sample(self, session):
+        """Pick existing ids the read scenarios look up."""
+        self.kits = session.scalars(select(Kit.id).order_by(Kit.id).limit(100)).all()
+        self.distributors = session.scalars(
+            select(Distributor.id).where(Distributor.status == 'active').order_by(Distributor.id).limit(20)
+        ).all()
+        self.components = session.scalars(
+            select(ComponentUsage.component_id).order_by(ComponentUsage.id).limit(100)
+        ).all()
+
+    def reserve_components(self, sets, singles):
+        """Insert fresh available components for the write scenarios (untimed)."""
+        created_at = datetime.utcnow()
+
+        def records():
+            for table_name, _, prefix in COMPONENT_TYPES:
+                count = sets + (singles if table_name == 'phones' else 0)
+                for index in range(count):
+                    yield table_name, {
+                        'id': self.component_id(prefix, index),
+                        'batch_number': 'BENCH',
+                        'model_number': f'{prefix}-BENCH',
+                        'status': 'available',
+                        'created_at': created_at,
+                    }
+
+        ImportEngine().load(records())
+        self.spare_sets = [
+            [self.component_id(prefix, index) for _, _, prefix in COMPONENT_TYPES]
+            for index in range(sets)
+        ]
+        self.spare_components = [self.component_id('PH', sets + index) for index in range(singles)]
+
+    def component_id(self, prefix, index):
+        return f'BENCH{self.run_id}{prefix}{index:06d}'
+
+    def kit_body(self):
+        return dict(zip(KIT_COMPONENT_KEYS, self.spare_sets.pop()))
+
+    def pick(self, values, iteration):
+        return values[iteration % len(values)]
+
+
+def _json(method, path, body):
+    return {'method': method, 'path': path, 'json': body}
+
+
+def _get(path, **query):
+    return {'method': 'GET', 'path': path, 'query_string': query}
+
+
+def _kit_detail_batch(ctx, iteration):
+    """The GETs behind the kit detail screen"""
+    return {'requests': [
+        {'path': f'/api/kits/{ctx.pick(ctx.kits, iteration)}'},
+        {'path': f'/api/distributors/{ctx.pick(ctx.distributors, iteration)}'},
+        {'path': f'/api/usage/component/{ctx.pick(ctx.components, iteration)}'},
+        {'path': f'/api/kits/search?distributorId={ctx.pick(ctx.distributors, iteration)}&limit=20'},
+    ]}
+
+
+def _pallet_scan(ctx, iteration):
+    """A pallet's worth of mixed kit and component ids, plus one that doesn't exist"""
+    return {'ids': ctx.kits + ctx.components + [f'UNKNOWN{iteration}']}
+
+
+def _import_upload(ctx, iteration, dry_run=False):
+    index = iteration % len(ctx.distributors)
+    document = {'distributors': [{
+        'id': ctx.distributors[index],
+        'name': f'Distributor {index}',
+        'email': f'bench{index}@example.com',
+        'tel': '555-0000000',
+        'address': '1 Main St',
+        'city': 'Boston',
+        'contact_person': f'Contact {index}',
+        'status': 'active',
+        'created_at': '2024-01-01T00:00:00',
+    }]}
+    data = {'file': (io.BytesIO(json.dumps(document).encode()), 'import.json')}
+    if dry_run:
+        data['dry_run'] = 'true'
+    return {'method': 'POST', 'path': '/api/import', 'data': data, 'content_type': 'multipart/form-data'}
+
+
+def _created_kit(ctx, response):
+    if response.status_code == 201:
+        ctx.created_kits.append(response.get_json()['kit_ID'])
+
+
+def _created_many(ctx, response):
+    if response.status_code == 201:
+        ctx.many_kits.append(response.get_json()['created_kits'])
+
+
+def _distribute(ctx, iteration):
+    kit_id = ctx.created_kits.pop() if ctx.created_kits else ctx.pick(ctx.kits, iteration)
+    ctx.distributed.append(kit_id)
+    return _json('POST', '/api/kits/distribute', {'kits': [kit_id], 'distributor_id': ctx.pick(ctx.distributors, iteration)})
+
+
+def _collect(ctx, iteration):
+    kit_id = ctx.distributed.pop(0) if ctx.distributed else ctx.pick(ctx.kits, iteration)
+    ctx.collected.append(kit_id)
+    return _json('PATCH', '/api/kits/collect', {'kits': [kit_id]})
+
+
+def _disassemble(ctx, iteration):
+    kit_id = ctx.collected.pop(0) if ctx.collected else ctx.pick(ctx.kits, iteration)
+    return _json('POST', '/api/kits/disassemble', {'kit_ID': kit_id})
+
+
+def _disassemble_many(ctx, iteration):
+    kit_ids = ctx.many_kits.pop() if ctx.many_kits else ctx.kits[:5]
+    return _json('POST', '/api/kits/disassemble_many', {'kit_IDs': kit_ids})
+
+
+def _status_change(ctx, iteration):
+    # alternate so every request is a real change
+    status = 'Unavailable' if iteration % 2 == 0 else 'Available'
+    return _json('POST', '/api/kits/satus_change', {'kit_id': ctx.kits[-1], 'status': status})
+
+
+def _create_by_batch(ctx, iteration):
+    ids = [{'id': f'BENCH{ctx.run_id}NEW{iteration:04d}{n:02d}', 'model_number': 'PH-M1'} for n in range(10)]
+    return _json('POST', '/api/phone/createByBatch', {'ids': ids, 'batch_number': f'BENCH{ctx.run_id}'})
+
+
+def _create_distributor(ctx, iteration):
+    distributor_id = f'BENCH{ctx.run_id}D{iteration:04d}'
+    return _json('POST', '/api/distributors/create', {
+        'id': distributor_id,
+        'name': f'Bench distributor {iteration}',
+        'email': f'{distributor_id.lower()}@example.com',
+        'tel': '555-0000000',
+        'address': '1 Main St',
+        'city': 'Boston',
+        'contact_person': 'Bench',
+    })
+
+
+READ_SCENARIOS = [
+    Scenario('home', 'api.home', lambda ctx, i: _get('/api/')),
+    Scenario('kits.get_all', 'api.get_all_kits', lambda ctx, i: _get('/api/kits/getAll')),
+    Scenario('kits.get_all.fields', 'api.get_all_kits', lambda ctx, i: _get('/api/kits/getAll', fields='id,status')),
+    Scenario('kits.search', 'api.search_kits', lambda ctx, i: _get('/api/kits/search', status='In-use')),
+    Scenario('kits.search.compound', 'api.search_kits',
+             lambda ctx, i: _get('/api/kits/search', status='In-use,Used', distributorId=ctx.pick(ctx.distributors, i),
+                                 startDate='2024-03-01', endDate='2025-03-01', sort='created_at')),
+    Scenario('kits.get_by_id', 'api.get_kit_by_id', lambda ctx, i: _get(f'/api/kits/{ctx.pick(ctx.kits, i)}')),
+    Scenario('kits.sort_by_created_at_desc', 'api.get_kits_by_created_at_desc',
+             lambda ctx, i: _get('/api/kits/sortByCreatedAtDesc')),
+    Scenario('kits.filter_by_created_at_range', 'api.get_kits_by_date_range',
+             lambda ctx, i: _get('/api/kits/filterByCreatedAtRange', startDate='2024-03-01', endDate='2024-04-01')),
+    Scenario('kits.filter_by_batch_number', 'api.get_kits_by_batch_number',
+             lambda ctx, i: _get('/api/kits/filterByBatchNumber', batchNumber=ctx.batch_number)),
+    Scenario('kits.filter_by_status', 'api.get_kits_by_status',
+             lambda ctx, i: _get('/api/kits/filterByStatus', status='Available')),
+    Scenario('kits.filter_by_distributor_id', 'api.get_kits_by_distributor_id',
+             lambda ctx, i: _get('/api/kits/filterByDistributorId', distributorId=ctx.pick(ctx.distributors, i))),
+    Scenario('components.list', 'api.get_all_components', lambda ctx, i: _get('/api/components')),
+    Scenario('components.batch_query', 'api.get_components_by_batch_number',
+             lambda ctx, i: _get(f'/api/components/batch_query/{ctx.batch_number}')),
+    Scenario('distributors.list', 'api.get_all_distributors', lambda ctx, i: _get('/api/distributors')),
+    Scenario('distributors.get', 'api.get_distributor_by_id',
+             lambda ctx, i: _get(f'/api/distributors/{ctx.pick(ctx.distributors, i)}')),
+    Scenario('usage.list', 'api.get_all_usages', lambda ctx, i: _get('/api/usage')),
+    Scenario('usage.by_component', 'api.get_usage_by_component',
+             lambda ctx, i: _get(f'/api/usage/component/{ctx.pick(ctx.components, i)}')),
+    Scenario('usage.discard_rate', 'api.get_discard_rate', lambda ctx, i: _get('/api/discard-rate', months=6)),
+    Scenario('export.json', 'api.export_all', lambda ctx, i: _get('/api/exportdb', format='json'), repeat=EXPORT_REPEAT),
+    Scenario('export.ndjson', 'api.export_all', lambda ctx, i: _get('/api/exportdb', format='ndjson'),
+             repeat=EXPORT_REPEAT),
+    Scenario('export.csv', 'api.export_all', lambda ctx, i: _get('/api/exportdb', format='csv'), repeat=EXPORT_REPEAT),
+    Scenario('summary', 'api.get_inventory_summary', lambda ctx, i: _get('/api/summary')),
+    Scenario('typeahead', 'api.typeahead', lambda ctx, i: _get('/api/typeahead', q=ctx.pick(ctx.kits, i)[:6])),
+    Scenario('typeahead.filtered', 'api.typeahead',
+             lambda ctx, i: _get('/api/typeahead', q='SIM', types='sim_card', status='available')),
+    Scenario('scan.pallet', 'api.resolve_scanned_ids', lambda ctx, i: _json('POST', '/api/scan', _pallet_scan(ctx, i))),
+    Scenario('reconcile.report', 'api.get_reconciliation_report', lambda ctx, i: _get('/api/reconcile')),
+    Scenario('batch.kit_detail', 'api.batch', lambda ctx, i: _json('POST', '/api/batch', _kit_detail_batch(ctx, i))),
+    Scenario('batch.kit_detail.parallel', 'api.batch',
+             lambda ctx, i: _json('POST', '/api/batch', dict(_kit_detail_batch(ctx, i), parallel=True))),
+    Scenario('import.dry_run', 'api.import_data', lambda ctx, i: _import_upload(ctx, i, dry_run=True)),
+    Scenario('metrics', 'api.get_metrics', lambda ctx, i: _get('/api/metrics')),
+    Scenario('metrics.pool', 'api.get_pool_metrics', lambda ctx, i: _get('/api/metrics/pool')),
+]
+
+# (scenario, hook called with each response) -- hooks thread state between write scenarios
+WRITE_SCENARIOS = [
+    (Scenario('components.create_by_batch', 'api.create_by_batch', _create_by_batch, writes=True), None),
+    (Scenario('components.status_update', 'api.update_component',
+              lambda ctx, i: _json('PUT', f'/api/components/status_update/{ctx.spare_components.pop()}',
+                                   {'status': 'refurbishing'}), writes=True), None),
+    (Scenario('kits.create', 'api.create_kit', lambda ctx, i: _json('POST', '/api/kits/create', ctx.kit_body()),
+              writes=True), _created_kit),
+    (Scenario('kits.create_many', 'api.create_many_kits',
+              lambda ctx, i: _json('POST', '/api/kits/create_many', [ctx.kit_body() for _ in range(5)]),
+              writes=True), _created_many),
+    (Scenario('kits.distribute', 'api.distribute_kits', _distribute, writes=True), None),
+    (Scenario('kits.collect', 'api.collect_kits', _collect, writes=True), None),
+    (Scenario('kits.disassemble', 'api.disassemble_kit', _disassemble, writes=True), None),
+    (Scenario('kits.disassemble_many', 'api.batch_disassemble_kit', _disassemble_many, writes=True), None),
+    (Scenario('kits.status_change', 'api.kits_satus_change', _status_change, writes=True), None),
+    (Scenario('distributors.create', 'api.create_distributor', _create_distributor, writes=True), None),
+    (Scenario('distributors.update', 'api.update_distributor',
+              lambda ctx, i: _json('PUT', f'/api/distributors/{ctx.pick(ctx.distributors, i)}',
+                                   {'city': f'City {i}'}), writes=True), None),
+    (Scenario('distributors.status', 'api.update_distributor_status',
+              lambda ctx, i: _json('PATCH', f'/api/distributors/{ctx.distributors[-1]}/status',
+                                   {'status': 'inactive' if i % 2 == 0 else 'active'}), writes=True), None),
+    (Scenario('import.json', 'api.import_data', _import_upload, writes=True), None),
+    (Scenario('reconcile.repair', 'api.repair_inconsistencies', lambda ctx, i: _json('POST', '/api/reconcile', {}),
+              writes=True), None),
+]
+
+
+def summarize(samples_ms, queries, statuses, peak_bytes):
+    samples = sorted(samples_ms)
+    return {
+        'requests': len(samples),
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else None,
+        'p50_ms': percentile(samples, 0.50),
+        'p95_ms': percentile(samples, 0.95),
+        'p99_ms': percentile(samples, 0.99),
+        'max_ms': samples[-1] if samples else None,
+        'queries': percentile(sorted(queries), 0.50),
+        'max_queries': max(queries) if queries else None,
+        'peak_memory_kb': round(peak_bytes / 1024, 1),
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_scenario(client, ctx, scenario, repeat, on_response=None):
+    """Warm-up under tracemalloc, then ``repeat`` timed requests."""
+    samples, queries, statuses = [], [], Counter()
+
+    tracemalloc.start()
+    try:
+        response = client.open(**scenario.build(ctx, 0))
+        response.get_data()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    statuses[response.status_code] += 1
+    if on_response:
+        on_response(ctx, response)
+
+    for iteration in range(1, repeat + 1):
+        kwargs = scenario.build(ctx, iteration)
+        start = time.perf_counter()
+        response = client.open(**kwargs)
+        # streamed bodies are only produced when read
+        response.get_data()
+        samples.append(round((time.perf_counter() - start) * 1000, 3))
+        # streamed responses carry no count: their queries run after the headers are sent
+        if 'X-Query-Count' in response.headers:
+            queries.append(int(response.headers['X-Query-Count']))
+        statuses[response.status_code] += 1
+        if on_response:
+            on_response(ctx, response)
+
+    return summarize(samples, queries, statuses, peak)
+
+
+def api_endpoints(app):
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.startswith('api.')})
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(app, spec, repeat=20, writes=True, only=None, log=print):
+    """Run every scenario against ``app`` (already holding the fleet) and return the results document."""
+    ctx = Context(spec)
+    scenarios = [(scenario, None) for scenario in READ_SCENARIOS]
+    if writes:
+        scenarios += WRITE_SCENARIOS
+    if only:
+        scenarios = [(scenario, hook) for scenario, hook in scenarios if scenario.name.startswith(tuple(only))]
+
+    with app.app_context():
+        ctx.sample(db.session)
+        if writes:
+            # one set per kits.create request, five per kits.create_many request (plus warm-ups)
+            ctx.reserve_components(sets=6 * (repeat + 1), singles=repeat + 1)
+        db.session.remove()
+
+    results = {}
+    failed = []
+    client = app.test_client()
+    for scenario, hook in scenarios:
+        log(f'  {scenario.name} ...')
+        results[scenario.name] = dict(
+            run_scenario(client, ctx, scenario, scenario.repeat or repeat, hook),
+            endpoint=scenario.endpoint,
+        )
+        # timings of error responses measure the error path, not the endpoint
+        if any(int(code) >= 400 for code in results[scenario.name]['status']):
+            failed.append(scenario.name)
+
+    # coverage of the suite itself, regardless of --only / --read-only
+    covered = {scenario.endpoint for scenario in READ_SCENARIOS}
+    covered.update(scenario.endpoint for scenario, _ in WRITE_SCENARIOS)
+    return {
+        'meta': {
+            'scale': spec.rows,
+            'seed': spec.seed,
+            'kits': spec.kits,
+            'repeat': repeat,
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'results': results,
+        'failed': failed,
+        'uncovered': [endpoint for endpoint in api_endpoints(app) if endpoint not in covered],
+    }
+
+
+def compare(current, baseline, threshold=0.2, min_delta_ms=1.0):
+    """
+    List regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its p50 grows by more than ``threshold``
+    (a fraction) and by at least ``min_delta_ms``, or when its median
+    query count grows at all.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if before['p50_ms'] is not None and result['p50_ms'] is not None:
+            delta = result['p50_ms'] - before['p50_ms']
+            if delta >= min_delta_ms and result['p50_ms'] > before['p50_ms'] * (1 + threshold):
+                regressions.append(f"{name}: p50 {before['p50_ms']}ms -> {result['p50_ms']}ms")
+        if before.get('queries') is not None and result.get('queries') is not None \
+                and before['queries'] < result['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
+
+
+def format_table(document):
+    header = f"{'scenario':36} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'peak KB':>9}  status"
+    lines = [header, '-' * len(header)]
+    for name, result in document['results'].items():
+        status = ' '.join(f'{code}x{count}' for code, count in result['status'].items())
+        lines.append(
+            f"{name:36} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+            f"{'-' if result['queries'] is None else result['queries']:>8} {result['peak_memory_kb']:>9}  {status}"
+        )
+    if document.get('failed'):
+        lines.append(f"scenarios with error responses: {', '.join(document['failed'])}")
+    if document['uncovered']:
+        lines.append(f"uncovered endpoints: {', '.join(document['uncovered'])}")
+    return '\n'.join(lines)
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for production. Run from the ``backend`` directory:
+
+    gunicorn -c medrhythms/gunicorn.conf.py
+
+Every value can be overridden from the environment (GUNICORN_* / WEB_CONCURRENCY)
+or on the command line.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'medrhythms.app.wsgi:app'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# one process per core plus one; each runs a few threads, since most of a
+# request is spent waiting on MySQL. Keep threads <= DB_POOL_SIZE + DB_MAX_OVERFLOW.
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# import the app once in the master; workers fork with the code already loaded
+preload_app = True
+
+# recycle workers after a jittered number of requests so they never restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# exports stream for a while; allow them to finish on reload/shutdown
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    from medrhythms.app.wsgi import post_fork as reset_after_fork
+
+    reset_after_fork()
+    server.log.info('Worker %s: database pools and log listeners reset after fork', worker.pid)
@@ -0,0 +1,54 @@
+import pytest
+
+from medrhythms.app import create_app
+from medrhythms.app.cache import distributor_cache
+from medrhythms.app.config import TestingConfig
+
+COMPONENT_TYPES = ('phone', 'sim_card', 'right_sensor', 'left_sensor', 'headphone', 'box')
+
+
+@pytest.fixture
+def app():
+    # every app gets its own in-memory database; no context stays pushed,
+    # so each test-client request gets its own session as it would in production
+    distributor_cache.invalidate()
+    return create_app(TestingConfig)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_kit(client):
+    """Create the six components and a kit from them through the API; returns the kit id."""
+    created = []
+
+    def make_kit(suffix=None):
+        suffix = suffix or str(len(created) + 1)
+        for component_type in COMPONENT_TYPES:
+            response = client.post(f'/api/{component_type}/createByBatch', json={
+                'batch_number': 'B1', 'ids': [{'id': f'{component_type}-{suffix}', 'model_number': 'M1'}],
+            })
+            assert response.status_code == 201, response.get_json()
+        response = client.post('/api/kits/create', json={
+            'phone_ID': f'phone-{suffix}', 'SIM_card_ID': f'sim_card-{suffix}',
+            'right_sensor_ID': f'right_sensor-{suffix}', 'left_sensor_ID': f'left_sensor-{suffix}',
+            'headphones_ID': f'headphone-{suffix}', 'box_ID': f'box-{suffix}',
+        })
+        assert response.status_code == 201, response.get_json()
+        created.append(response.get_json()['kit_ID'])
+        return created[-1]
+
+    return make_kit
+
+
+@pytest.fixture
+def distributor(client):
+    response = client.post('/api/distributors/create', json={
+        'id': 'D1', 'name': 'Clinic One', 'email': 'clinic@example.com', 'tel': '555-0100',
+        'address': '1 Main St', 'city': 'Boston', 'contact_person': 'Sam',
+    })
+    assert response.status_code == 201, response.get_json()
+    return 'D1'
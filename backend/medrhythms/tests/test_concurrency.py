@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+
+from medrhythms.app import db
+from medrhythms.app.models import Kit
+
+
+def _kit(app, kit_id):
+    with app.app_context():
+        kit = db.session.get(Kit, kit_id)
+        return {'status': kit.status, 'version': kit.version}
+
+
+def test_status_change_with_current_version(app, client, make_kit):
+    kit_id = make_kit()
+    version = _kit(app, kit_id)['version']
+
+    response = client.post('/api/kits/satus_change', json={'kit_id': kit_id, 'status': 'Unavailable', 'version': version})
+
+    assert response.status_code == 200
+    assert response.get_json()['version'] == version + 1
+
+
+def test_status_change_with_stale_version(app, client, make_kit):
+    kit_id = make_kit()
+    version = _kit(app, kit_id)['version']
+    client.post('/api/kits/satus_change', json={'kit_id': kit_id, 'status': 'Unavailable'})
+
+    response = client.post('/api/kits/satus_change', json={'kit_id': kit_id, 'status': 'Available', 'version': version})
+
+    assert response.status_code == 409
+    body = response.get_json()
+    assert (body['expected_version'], body['current_version']) == (version, version + 1)
+    assert body['current_status'] == 'Unavailable'
+    assert _kit(app, kit_id)['status'] == 'Unavailable'
+
+
+def test_distribute_with_stale_version_changes_nothing(app, client, make_kit, distributor):
+    first, second = make_kit('1'), make_kit('2')
+    versions = {first: _kit(app, first)['version'], second: _kit(app, second)['version'] - 1}
+
+    response = client.post('/api/kits/distribute', json={
+        'kits': [first, second], 'distributor_id': distributor, 'versions': versions,
+    })
+
+    assert response.status_code == 409
+    assert response.get_json()['id'] == second
+    assert _kit(app, first)['status'] == 'Available'
+    assert client.get('/api/usage').get_json() == []
+
+
+def test_collect_with_stale_version(app, client, make_kit, distributor):
+    kit_id = make_kit()
+    version = _kit(app, kit_id)['version']
+    client.post('/api/kits/distribute', json={'kits': [kit_id], 'distributor_id': distributor})
+
+    response = client.patch('/api/kits/collect', json={'kits': [kit_id], 'versions': {kit_id: version}})
+
+    assert response.status_code == 409
+    assert _kit(app, kit_id)['status'] == 'In-use'
+
+
+@pytest.mark.parametrize('path, method, body', [
+    ('/api/kits/satus_change', 'post', {'status': 'Unavailable', 'version': 'abc'}),
+    ('/api/kits/distribute', 'post', {'distributor_id': 'D1', 'versions': {'{kit}': 'abc'}}),
+    ('/api/kits/distribute', 'post', {'distributor_id': 'D1', 'versions': ['abc']}),
+    ('/api/kits/collect', 'patch', {'versions': {'{kit}': 'abc'}}),
+    ('/api/kits/disassemble', 'post', {'version': 'abc'}),
+])
+def test_malformed_version_is_a_bad_request(app, client, make_kit, distributor, path, method, body):
+    kit_id = make_kit()
+    body = dict(body, kit_id=kit_id, kit_ID=kit_id, kits=[kit_id])
+    if isinstance(body.get('versions'), dict):
+        body['versions'] = {kit_id: 'abc'}
+
+    response = getattr(client, method)(path, json=body)
+
+    assert response.status_code == 400, response.get_json()
+    assert _kit(app, kit_id)['status'] == 'Available'
+
+
+def test_concurrent_update_raises_stale_data(app, make_kit):
+    kit_id = make_kit()
+    with app.app_context():
+        kit = db.session.get(Kit, kit_id)
+
+        # another worker changes the kit after this session loaded it
+        with db.engine.begin() as connection:
+            connection.execute(update(Kit).where(Kit.id == kit_id).values(version=Kit.version + 1))
+        kit.status = 'Used'
+
+        with pytest.raises(StaleDataError):
+            db.session.commit()
@@ -0,0 +1,83 @@
+import io
+import json
+
+from sqlalchemy import event
+
+from medrhythms.app import counters, db
+from medrhythms.app.models import Phone
+
+
+def _stored(app):
+    with app.app_context():
+        return counters.stored_counts(db.session)
+
+
+def _drift(app):
+    with app.app_context():
+        return counters.verify(db.session)
+
+
+def test_counters_follow_api_writes(app, client, make_kit, distributor):
+    kits = [make_kit(str(n)) for n in range(3)]
+    client.post('/api/phone/createByBatch', json={'batch_number': 'B2', 'ids': [{'id': 'spare', 'model_number': 'M1'}]})
+    assert client.post('/api/kits/distribute', json={'kits': kits[:2], 'distributor_id': distributor}).status_code == 200
+    assert client.patch('/api/kits/collect', json={'kits': kits[:1]}).status_code == 200
+    assert client.post('/api/kits/satus_change', json={'kit_id': kits[2], 'status': 'Unavailable'}).status_code == 200
+    assert client.put('/api/components/status_update/spare', json={'status': 'refurbishing'}).status_code == 200
+    assert client.post('/api/kits/disassemble', json={'kit_ID': kits[0]}).status_code == 200
+
+    assert _drift(app) == {}
+    stored = _stored(app)
+    assert stored[('kit', distributor, 'In-use')] == 1
+    # the spare, and the disassembled kit's phone
+    assert stored[('phone', '', 'refurbishing')] == 2
+
+
+def test_counters_follow_imports(app, client, make_kit):
+    make_kit()
+    document = json.loads(client.get('/api/exportdb?format=json').get_data())
+    for phone in document['phones']:
+        phone['status'] = 'discarded'
+    document['phones'].append(dict(document['phones'][0], id='imported', kit_id=None))
+
+    response = client.post('/api/import', data={'file': (io.BytesIO(json.dumps(document).encode()), 'import.json')})
+
+    assert response.status_code == 200, response.get_json()
+    assert _drift(app) == {}
+    assert _stored(app)[('phone', '', 'discarded')] == 2
+
+
+def test_rollback_leaves_counters_unchanged(app, make_kit):
+    make_kit()
+    before = _stored(app)
+
+    with app.app_context():
+        db.session.add(Phone(id='rolled-back', model_number='M1', batch_number='B1'))
+        db.session.get(Phone, 'phone-1').status = 'discarded'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+    assert _stored(app) == before
+
+
+def test_deltas_are_applied_once_per_commit(app, client, make_kit, distributor):
+    kits = [make_kit(str(n)) for n in range(3)]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'inventory_counter' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        # flushes once per kit, commits once
+        response = client.post('/api/kits/distribute', json={'kits': kits, 'distributor_id': distributor})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert _drift(app) == {}
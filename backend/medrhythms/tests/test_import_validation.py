@@ -0,0 +1,63 @@
+import io
+import json
+
+from medrhythms.app.importer import ImportValidator
+
+CREATED_AT = '2024-01-01T00:00:00'
+
+
+def _dry_run(client, document):
+    body = json.dumps(document).encode('utf-8')
+    return client.post('/api/import?dry_run=1', data={'file': (io.BytesIO(body), 'import.json')})
+
+
+def test_usage_row_without_id_is_an_insert(app, make_kit):
+    kit_id = make_kit()
+    records = [
+        ('component_usages', {'component_id': 'phone-1', 'component_type': 'phone', 'kit_id': kit_id,
+                              'start_time': CREATED_AT}),
+        ('component_usages', {'component_id': 'box-1', 'component_type': 'box', 'kit_id': kit_id,
+                              'start_time': CREATED_AT}),
+    ]
+
+    with app.app_context():
+        report = ImportValidator().validate(records)
+
+    assert report['valid'], report['errors']
+    assert report['tables']['component_usages'] == {
+        'rows': 2, 'inserts': 2, 'updates': 0, 'invalid': 0, 'duplicates': 0,
+    }
+
+
+def test_missing_required_value(client):
+    response = _dry_run(client, {'phones': [{'id': 'p1', 'batch_number': 'B1', 'created_at': CREATED_AT}]})
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert not report['valid']
+    assert report['errors'][0]['column'] == 'model_number'
+    assert report['errors'][0]['message'] == 'Value is required'
+
+
+def test_references_are_checked_against_file_and_database(client, make_kit):
+    kit_id = make_kit()
+    response = _dry_run(client, {
+        'distributors': [{'id': 'D9', 'name': 'n', 'email': 'd9@example.com', 'tel': '1', 'address': 'a',
+                          'city': 'c', 'contact_person': 'p', 'status': 'active', 'created_at': CREATED_AT}],
+        'kits': [
+            {'id': kit_id, 'status': 'In-use', 'distributor_id': 'D9', 'created_at': CREATED_AT},
+            {'id': 'K-NEW', 'status': 'Available', 'distributor_id': 'NOPE', 'created_at': CREATED_AT},
+        ],
+    })
+
+    report = response.get_json()
+    assert report['error_count'] == 1
+    assert report['errors'][0]['value'] == 'NOPE'
+    assert report['tables']['kits']['updates'] == 1
+    assert report['tables']['kits']['inserts'] == 1
+
+
+def test_dry_run_writes_nothing(client):
+    _dry_run(client, {'phones': [{'id': 'p1', 'model_number': 'M1', 'batch_number': 'B1', 'created_at': CREATED_AT}]})
+
+    assert client.get('/api/components').get_json()['components'] == []
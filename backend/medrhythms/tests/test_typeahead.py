@@ -0,0 +1,60 @@
+import pytest
+
+from medrhythms.app import db
+from medrhythms.app.versioning import bump_versions
+
+
+@pytest.fixture
+def rebuilds(app, monkeypatch):
+    """Check freshness on every query and record background rebuilds instead of starting them."""
+    index = app.extensions['typeahead']
+    index.refresh_seconds = 0
+    started = []
+    monkeypatch.setattr(index, '_rebuild_in_background', lambda: started.append(True))
+    return started
+
+
+def _ids(client, **params):
+    response = client.get('/api/typeahead', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return [(match['type'], match['id']) for match in response.get_json()['matches']]
+
+
+def test_prefix_search(client, make_kit):
+    make_kit('1')
+    make_kit('2')
+
+    assert _ids(client, q='PHONE-') == [('phone', 'phone-1'), ('phone', 'phone-2')]
+    assert _ids(client, q='phone-', limit=1) == [('phone', 'phone-1')]
+    assert _ids(client, q='b', types='box') == [('box', 'box-1'), ('box', 'box-2')]
+    assert _ids(client, q='b', types='kit') == []
+    assert _ids(client, q='phone', status='in-kit') == [('phone', 'phone-1'), ('phone', 'phone-2')]
+    assert _ids(client, q='phone', status='available') == []
+
+
+def test_unknown_type(client):
+    assert client.get('/api/typeahead?q=a&types=widget').status_code == 400
+
+
+def test_local_writes_are_applied_without_a_rebuild(client, make_kit, rebuilds):
+    kit_id = make_kit('1')
+    assert _ids(client, q='phone-1') == [('phone', 'phone-1')]
+
+    make_kit('2')
+    assert client.post('/api/kits/satus_change', json={'kit_id': kit_id, 'status': 'Unavailable'}).status_code == 200
+
+    assert _ids(client, q='phone-') == [('phone', 'phone-1'), ('phone', 'phone-2')]
+    assert _ids(client, q=kit_id, types='kit', status='Unavailable') == [('kit', kit_id)]
+    assert rebuilds == []
+
+
+def test_writes_from_elsewhere_trigger_a_rebuild(app, client, make_kit, rebuilds):
+    make_kit('1')
+    _ids(client, q='phone')
+
+    # another worker's commit: the counter moves without this process applying anything
+    with app.app_context(), db.engine.begin() as connection:
+        bump_versions(connection, ['phone'])
+    _ids(client, q='phone')
+
+    assert rebuilds == [True]
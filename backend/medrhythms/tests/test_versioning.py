@@ -0,0 +1,58 @@
+from medrhythms.app import db
+from medrhythms.app.models import Phone
+from medrhythms.app.versioning import current_versions, TRACKED_TABLES
+
+TABLES = sorted(TRACKED_TABLES)
+
+
+def _versions(app):
+    with app.app_context():
+        return current_versions(TABLES)
+
+
+def test_one_bump_per_table_per_commit(app, client, make_kit, distributor):
+    kit_id = make_kit()
+    assert client.post('/api/kits/distribute', json={'kits': [kit_id], 'distributor_id': distributor}).status_code == 200
+    before = _versions(app)
+
+    # one commit that updates the kit and closes its six usage records
+    assert client.patch('/api/kits/collect', json={'kits': [kit_id]}).status_code == 200
+
+    after = _versions(app)
+    changed = {table: after[table] - before[table] for table in TABLES if after[table] != before[table]}
+    assert changed == {'kit': 1, 'component_usage': 1}
+
+
+def test_rollback_bumps_nothing(app):
+    before = _versions(app)
+
+    with app.app_context():
+        db.session.add(Phone(id='p1', model_number='M1', batch_number='B1'))
+        db.session.flush()
+        db.session.rollback()
+
+    assert _versions(app) == before
+
+
+def test_etag_changes_after_a_write(client, make_kit):
+    kit_id = make_kit()
+    response = client.get('/api/kits/getAll')
+    etag = response.headers['ETag']
+
+    assert client.get('/api/kits/getAll', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.post('/api/kits/satus_change', json={'kit_id': kit_id, 'status': 'Unavailable'}).status_code == 200
+    response = client.get('/api/kits/getAll', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_rebuild_counters_invalidates_the_summary(app, client, make_kit):
+    make_kit()
+    etag = client.get('/api/summary').headers['ETag']
+    assert client.get('/api/summary', headers={'If-None-Match': etag}).status_code == 304
+
+    result = app.test_cli_runner().invoke(args=['rebuild-counters'])
+
+    assert result.exit_code == 0, result.output
+    assert client.get('/api/summary', headers={'If-None-Match': etag}).status_code == 200
@@ -4,6 +4,15 @@ import axios from "axios";
 
 const BASE_URL = "http://127.0.0.1:5000/api";
 
+// Matches the backend's REPLICA_READ_YOUR_WRITES_SECONDS
+const READ_PRIMARY_WINDOW_MS = 5000;
+let readPrimaryUntil = 0;
+
+// The API is cross-origin, so the backend's read-your-writes cookie is never sent.
+// After a successful write, ask for reads from the primary database for a few seconds instead.
+const readPrimaryHeaders = () =>
+  Date.now() < readPrimaryUntil ? { "X-Read-Primary": "1" } : {};
+
 const api = axios.create({
   baseURL: BASE_URL,
   headers: {
@@ -11,6 +20,20 @@ const api = axios.create({
   },
 });
 
+api.interceptors.request.use((config) => {
+  if ((config.method || "get").toLowerCase() === "get") {
+    Object.assign(config.headers, readPrimaryHeaders());
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  if ((response.config.method || "get").toLowerCase() !== "get") {
+    readPrimaryUntil = Date.now() + READ_PRIMARY_WINDOW_MS;
+  }
+  return response;
+});
+
 export const kitService = {
   // Get all kits
   getAllKits: async () => {
@@ -492,6 +515,7 @@ export const exportService = {
       const response = await axios({
         url: `${BASE_URL}/exportdb?format=json`,
         method: "GET",
+        headers: readPrimaryHeaders(),
         responseType: "blob", // Important: indicates response is binary data
       });
 
@@ -521,6 +545,7 @@ export const exportService = {
       const response = await axios({
         url: `${BASE_URL}/exportdb?format=csv`,
         method: "GET",
+        headers: readPrimaryHeaders(),
         responseType: "blob", // Important: indicates response is binary data
       });
 